@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+未读计数的推送流（socials:unread_stream）是异步视图，需通过本入口以 ASGI 服务器
+（如 uvicorn RmsnBlog.asgi:application）部署，并设置 UNREAD_STREAM_ENABLED=True。
 """
 
 import os
@@ -57,6 +57,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.SessionUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,6 +74,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'socials.context_processors.realtime',
             ],
         },
     },
@@ -93,6 +95,23 @@ DATABASES = {
     }
 }
 
+# 缓存：设置 REDIS_URL 时使用 Redis（需安装 redis 包），否则为进程内缓存.
+# 会话与用户、未读计数、浏览量缓冲等依赖缓存在各进程间可见，只在 Redis / Memcached 上启用，
+# 进程内缓存下直接查询数据库（见 utils/cache.py）；不要用数据库缓存表代替，每次命中仍是一次查询.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -140,6 +159,50 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# 登录会话缓存：session_token 与用户对象在缓存中保留的秒数.
+SESSION_USER_CACHE_TIMEOUT = 300
+
+# 会话模式：'db' 为每次登录写一行 UserSession；'signed' 为 HMAC 签名的无状态 token，
+# 校验不访问数据库，注销/重置密码写入缓存中的吊销集合. 'signed' 需要 Redis / Memcached（REDIS_URL），
+# 其他缓存后端下自动按 'db' 签发.
+SESSION_TOKEN_MODE = os.environ.get('SESSION_TOKEN_MODE', 'db')
+# 签名模式下是否同时把吊销记录持久化到数据库（缓存项被清空或淘汰时兜底）；
+# 关闭后只记录在缓存中，缓存为本地内存（进程间不共享）时仍强制写数据库.
+SESSION_REVOCATION_DB = True
+
+# Markdown 渲染缓存：进程内 LRU 条目数与共享缓存的过期秒数.
+MARKDOWN_RENDER_LRU_SIZE = 256
+MARKDOWN_RENDER_CACHE_TIMEOUT = 24 * 3600
+
+# 文章浏览量缓冲：'memory' 为进程内累加并按间隔自行写回；
+# 'cache' 为记在共享缓存中，由 manage.py flush_view_counts 写回（需要 Redis / Memcached，否则按 'memory'）.
+VIEW_COUNTER_BACKEND = 'memory'
+VIEW_COUNTER_FLUSH_INTERVAL = 10  # 秒
+
+# 作者统计（仪表盘/个人主页）的缓存秒数，写操作会主动失效.
+AUTHOR_STATS_CACHE_TIMEOUT = 60
+
+# 标签自动完成：进程内索引的整表重载间隔（秒）与响应的浏览器缓存秒数.
+TAG_AUTOCOMPLETE_REFRESH = 300
+TAG_AUTOCOMPLETE_MAX_AGE = 60
+
+# 通知分发：'queue' 为请求内只登记事件，由 manage.py process_notifications --loop 批量写入；
+# 'sync' 为在请求内直接写入（本地调试无需常驻 worker）.
+NOTIFICATION_DISPATCH = os.environ.get('NOTIFICATION_DISPATCH', 'queue')
+# 通知聚合窗口（秒）：窗口内同一接收者、动作与目标的通知合并为一行，0 为关闭.
+NOTIFICATION_AGGREGATE_WINDOW = 24 * 3600
+
+# 未读计数：缓存秒数；推送流（SSE）只在以 ASGI（RmsnBlog.asgi）部署时开启，
+# 否则页面每 30 秒轮询一次合并的计数接口.
+UNREAD_COUNTER_CACHE_TIMEOUT = 300
+UNREAD_STREAM_ENABLED = os.environ.get('UNREAD_STREAM_ENABLED', 'False') == 'True'
+UNREAD_STREAM_POLL_INTERVAL = 10  # 秒；没有 Redis / Memcached 时至少 30 秒
+UNREAD_STREAM_MAX_SECONDS = 300
+
+# 页面片段缓存（文章正文、未登录访客的评论区、首页与全部文章列表）的秒数，
+# 写操作会换新键或主动失效，超时只兜底作者头像、用户名等变化.
+FRAGMENT_CACHE_TIMEOUT = 300
+
 # SMTP服务.
 # 所有变量均依赖于环境变量设置。
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -1,107 +1,79 @@
 from django.shortcuts import render, redirect
 from users.views import get_current_user
 from posting.models import Post
-from markdownx.utils import markdownify
-from django.utils.html import strip_tags
-from django.utils.text import Truncator
+from posting.fragments import fragment_timeout, posts_version
 from django.urls import reverse
-from django.core.paginator import Paginator
+from django.utils.functional import SimpleLazyObject
+from utils.pagination import paginate_by_cursor, decode_cursor
 
 
-def index(request):
-    user = get_current_user(request)
-
-    # 获取最新3篇文章并在视图中预处理展示所需的字段
-    qs = Post.objects.all().select_related('author').prefetch_related('tags').order_by('-created_at')[:3]
+def _post_cards(page):
+    """列表页卡片所需的字段。"""
     posts = []
-    for p in qs:
-        import re
-        # 优先使用已渲染的 HTML（p.content），若为空或看起来不是 HTML，则回退渲染可用的原始 Markdown（content_raw 或 p.content）
-        content_source = p.content or ''
-        if not content_source or '<' not in content_source:
-            raw_fallback = getattr(p, 'content_raw', '') or p.content or ''
-            if raw_fallback:
-                content_source = markdownify(raw_fallback)
-            else:
-                content_source = p.content or ''
-
-        # 额外清理：移除 Markdown 围栏代码（```...``` 或 ~~~...~~~），然后移除 HTML 的 <pre>/<code>
-        content_source = re.sub(r'```.*?```', ' ', content_source, flags=re.DOTALL)
-        content_source = re.sub(r'~~~.*?~~~', ' ', content_source, flags=re.DOTALL)
-        content_no_code = re.sub(r'<pre[^>]*>.*?</pre>', ' ', content_source, flags=re.DOTALL)
-        content_no_code = re.sub(r'<code[^>]*>.*?</code>', ' ', content_no_code, flags=re.DOTALL)
-        clean_content = strip_tags(content_no_code)
-        clean_content = re.sub(r'\s+', ' ', clean_content).strip()
-        excerpt = Truncator(clean_content).chars(200)
-        author_display = p.author.username
+    for p in page:
         # 获取标签列表
         tags = [{'name': tag.name, 'url': reverse('posting:search_posts') + f'?q=%23{tag.name}'} for tag in p.tags.all()]
         posts.append({
             'title': p.title,
             'url': reverse('posting:view_post', args=[p.id]),
-            'author': author_display,
+            'author': p.author.username,
             'author_username': p.author.username,
             'author_avatar': p.author.avatar_url,
             'created_at': p.created_at,
-            'excerpt': excerpt,
+            'excerpt': p.excerpt,
             'tags': tags,
         })
+    return posts
 
+
+def index(request):
+    user = get_current_user(request)
+
+    # 获取最新3篇文章并在视图中预处理展示所需的字段
+    # 摘要在写入时已计算好，列表页无需加载正文
+    qs = Post.objects.defer('content', 'content_raw').select_related('author').prefetch_related('tags').order_by('-created_at')[:3]
+
+    # 文章列表作为片段缓存，只有未命中时才会查询
     context = {
         'user': user,
-        'posts': posts,
+        'posts': SimpleLazyObject(lambda: _post_cards(qs)),
+        'posts_version': posts_version(),
+        'fragment_timeout': fragment_timeout(),
     }
     return render(request, 'index.html', context)
 
 
+def _page_key(before, after):
+    """片段缓存中列表页的键：由解码后的游标构成，无效游标与第一页共用同一个键。
+
+    与 paginate_by_cursor 的取舍一致：before 优先，无效的游标按未传处理。
+    """
+    key = decode_cursor(before, Post)
+    if key is not None:
+        return f'before|{key[0].isoformat()}|{key[1]}'
+    key = decode_cursor(after, Post)
+    if key is not None:
+        return f'after|{key[0].isoformat()}|{key[1]}'
+    return ''
+
+
 def all_posts(request):
-    """显示所有博客，分页，每页5条，按时间倒序"""
+    """显示所有博客，游标分页，每页5条，按时间倒序"""
     user = get_current_user(request)
     
     # 获取所有文章，按时间倒序
-    qs = Post.objects.all().select_related('author').prefetch_related('tags').order_by('-created_at')
+    qs = Post.objects.defer('content', 'content_raw').select_related('author').prefetch_related('tags').order_by('-created_at')
     
-    # 分页，每页5条
-    paginator = Paginator(qs, 5)
-    page_num = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_num)
-    
-    # 预处理数据
-    posts = []
-    for p in page_obj:
-        import re
-        # 优先使用已渲染的 HTML（p.content），若为空或看起来不是 HTML，则回退渲染可用的原始 Markdown（content_raw 或 p.content）
-        content_source = p.content or ''
-        if not content_source or '<' not in content_source:
-            raw_fallback = getattr(p, 'content_raw', '') or p.content or ''
-            if raw_fallback:
-                content_source = markdownify(raw_fallback)
-            else:
-                content_source = p.content or ''
-
-        # 移除代码块（<pre> 和 <code>）并清理标签与空白，生成摘要
-        content_no_code = re.sub(r'<pre[^>]*>.*?</pre>', ' ', content_source, flags=re.DOTALL)
-        content_no_code = re.sub(r'<code[^>]*>.*?</code>', ' ', content_no_code, flags=re.DOTALL)
-        clean_content = strip_tags(content_no_code)
-        clean_content = re.sub(r'\s+', ' ', clean_content).strip()
-        excerpt = Truncator(clean_content).chars(200)
-        # 获取标签列表
-        tags = [{'name': tag.name, 'url': reverse('posting:search_posts') + f'?q=%23{tag.name}'} for tag in p.tags.all()]
-        posts.append({
-            'title': p.title,
-            'url': reverse('posting:view_post', args=[p.id]),
-            'author': p.author.username,
-            'author_username': p.author.username,
-            'author_avatar': p.author.avatar_url,
-            'created_at': p.created_at,
-            'excerpt': excerpt,
-            'tags': tags,
-        })
+    # 游标分页，每页5条；列表与分页导航作为片段缓存，只有未命中时才会查询
+    before, after = request.GET.get('before', ''), request.GET.get('after', '')
+    page_obj = SimpleLazyObject(lambda: paginate_by_cursor(qs, before=before, after=after, per_page=5))
     
     context = {
         'user': user,
-        'posts': posts,
+        'posts': SimpleLazyObject(lambda: _post_cards(page_obj)),
         'page_obj': page_obj,
-        'paginator': paginator,
+        'page_key': _page_key(before, after),
+        'posts_version': posts_version(),
+        'fragment_timeout': fragment_timeout(),
     }
     return render(request, 'all_posts.html', context)
@@ -0,0 +1,44 @@
+"""文章评论树的加载。
+
+先分页取出当前页的顶级评论 id，再借助 thread_root 一次查询取出这些线程的全部评论
+（连同作者），在内存中按 parent 组装成树。每条评论的子回复挂在 ``tree_replies``
+属性上，模板递归时不再触发额外查询。
+"""
+from django.core.paginator import Paginator
+from .models import Comment
+
+# 每页显示的顶级评论（线程）数
+THREADS_PER_PAGE = 20
+
+
+def build_comment_tree(comments):
+    """把扁平的评论列表组装成树，返回按时间倒序的顶级评论列表。
+
+    子回复按时间正序排列；父评论不在列表中的回复会被当作顶级评论处理。
+    """
+    comments = sorted(comments, key=lambda c: c.created_at)
+    by_id = {}
+    for c in comments:
+        c.tree_replies = []
+        by_id[c.id] = c
+
+    roots = []
+    for c in comments:
+        parent = by_id.get(c.parent_id) if c.parent_id else None
+        if parent is not None:
+            parent.tree_replies.append(c)
+        else:
+            roots.append(c)
+    roots.reverse()
+    return roots
+
+
+def load_comment_tree(post, page_number=1, per_page=THREADS_PER_PAGE):
+    """加载文章的评论树并按顶级评论分页，返回 Page 对象（object_list 为顶级评论）。"""
+    root_ids = Comment.objects.filter(post=post, parent__isnull=True).order_by('-created_at').values_list('id', flat=True)
+    page = Paginator(root_ids, per_page).get_page(page_number)
+    comments = Comment.objects.filter(
+        post=post, thread_root__in=list(page.object_list)
+    ).select_related('author')
+    page.object_list = build_comment_tree(comments)
+    return page
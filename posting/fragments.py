@@ -0,0 +1,66 @@
+"""页面片段缓存：文章正文、评论区与文章列表。
+
+模板用 {% cache %} 缓存渲染好的片段，视图只把片段所需的数据以惰性对象传入，
+命中缓存时不会触发这些查询。与用户相关的部分（点赞状态、登录态、主题、评论的回复/删除按钮）
+始终在片段之外渲染，或只对未登录访客缓存。
+
+- 文章正文：键为 文章 id + updated_at，编辑文章即换新键；标签变化、文章删除时主动删除；
+- 评论区（仅未登录访客）：键为 文章 id + 评论数 + 最新评论时间 + 页码，增删评论即换新键；
+- 列表页（首页、全部文章）：键为 全局文章版本 + 分页游标，发文、编辑、删除、改标签时更新版本。
+"""
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from .models import Comment
+
+POSTS_VERSION_KEY = 'fragment_posts_version'
+POST_BODY_FRAGMENT = 'post_body'
+
+
+def fragment_timeout() -> int:
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300)
+
+
+def _stamp(dt) -> str:
+    return f'{dt.timestamp():.6f}' if dt else '0'
+
+
+def post_body_version(post) -> str:
+    return _stamp(post.updated_at)
+
+
+def comments_version(post) -> str:
+    """评论数与最新评论时间组成的版本号；删除评论时评论数会变化，因此不只看最新时间。"""
+    latest = (
+        Comment.objects.filter(post=post).order_by('-created_at')
+        .values_list('created_at', flat=True).first()
+    )
+    return f'{post.comments_count}-{_stamp(latest)}'
+
+
+def posts_version() -> str:
+    try:
+        version = cache.get(POSTS_VERSION_KEY)
+    except Exception:
+        return '0'
+    if version is None:
+        # 版本取当前时间，缓存被清空后重新生成也不会与旧键重复
+        version = bump_posts_version()
+    return version
+
+
+def bump_posts_version() -> str:
+    version = str(time.time_ns())
+    try:
+        cache.set(POSTS_VERSION_KEY, version, timeout=None)
+    except Exception:
+        pass
+    return version
+
+
+def invalidate_post_body(post):
+    try:
+        cache.delete(make_template_fragment_key(POST_BODY_FRAGMENT, [post.id, post_body_version(post)]))
+    except Exception:
+        pass
@@ -0,0 +1,94 @@
+"""服务端代码高亮。
+
+- 代码块正则与 HtmlFormatter 在进程内只构建一次；
+- 语言别名 -> lexer 实例缓存在进程级注册表中（未知别名同样缓存为纯文本）；
+- 未标注语言的代码块先走一遍廉价的特征匹配，匹配不到才调用 guess_lexer，
+  且只取前 GUESS_SAMPLE_CHARS 个字符，并受单篇文档的总耗时预算限制，
+  超出预算后剩余代码块按纯文本输出。
+"""
+from functools import lru_cache
+import html as pyhtml
+import re
+import time
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name, guess_lexer
+from pygments.lexers.special import TextLexer
+from pygments.util import ClassNotFound
+
+CODE_CSS_CLASS = 'codehilite'
+# guess_lexer 只分析代码开头这么多字符
+GUESS_SAMPLE_CHARS = 2000
+# 单次 highlight_code_blocks 调用中 guess_lexer 的累计耗时上限（秒）
+GUESS_TIME_BUDGET = 0.25
+
+_CODE_BLOCK_RE = re.compile(r'<pre><code(?: class="language-([^"]+)")?>(.*?)</code></pre>', re.DOTALL)
+_FORMATTER = HtmlFormatter(cssclass=CODE_CSS_CLASS)
+
+# 特征匹配：(正则, 语言别名)，按顺序尝试，命中第一个即返回
+_HEURISTICS = [
+    (re.compile(r'\A#!.*\b(?:ba|z)?sh\b'), 'bash'),
+    (re.compile(r'\A#!.*\bpython'), 'python'),
+    (re.compile(r'\A\s*<\?php'), 'php'),
+    (re.compile(r'\A\s*<!DOCTYPE html|\A\s*<(?:html|head|body|div|span|p)\b', re.I), 'html'),
+    (re.compile(r'\A\s*[\[{]\s*"'), 'json'),
+    (re.compile(r'^\s*#include\s*[<"]', re.M), 'cpp'),
+    (re.compile(r'^\s*package\s+\w+\s*$.*^\s*func\s', re.M | re.S), 'go'),
+    (re.compile(r'^\s*(?:use\s+\w+::|fn\s+\w+\s*\(|let\s+mut\s)', re.M), 'rust'),
+    (re.compile(r'^\s*(?:public|private)\s+(?:static\s+)?(?:class|void)\s', re.M), 'java'),
+    (re.compile(r'^\s*(?:def\s+\w+\s*\(.*\)\s*(?:->.*)?:|from\s+[\w.]+\s+import\s|import\s+[\w.]+\s*$|class\s+\w+.*:\s*$)', re.M), 'python'),
+    (re.compile(r'^\s*(?:const|let|var)\s+\w+\s*=|^\s*function\s+\w*\s*\(|=>\s*[{(]', re.M), 'javascript'),
+    (re.compile(r'^\s*(?:SELECT\s.+\sFROM|INSERT\s+INTO|UPDATE\s+\w+\s+SET|CREATE\s+TABLE)\b', re.M | re.I), 'sql'),
+    (re.compile(r'^\s*[.#]?[\w-]+\s*\{\s*$\s*[\w-]+\s*:', re.M), 'css'),
+    (re.compile(r'^\s*(?:\$\s|sudo\s|apt(?:-get)?\s|pip\s+install|cd\s|echo\s)', re.M), 'bash'),
+]
+
+
+@lru_cache(maxsize=256)
+def lexer_for_alias(alias: str):
+    """按语言别名获取 lexer；未知别名回退为纯文本。结果在进程内复用。"""
+    try:
+        return get_lexer_by_name(alias, stripall=True)
+    except ClassNotFound:
+        return TextLexer()
+
+
+def guess_alias(code: str):
+    """廉价的语言特征匹配，无法判断时返回 None。"""
+    sample = code[:GUESS_SAMPLE_CHARS]
+    for pattern, alias in _HEURISTICS:
+        if pattern.search(sample):
+            return alias
+    return None
+
+
+class _GuessBudget:
+    def __init__(self, seconds):
+        self.remaining = seconds
+
+    def guess(self, code):
+        if self.remaining <= 0:
+            return TextLexer()
+        started = time.monotonic()
+        try:
+            return guess_lexer(code[:GUESS_SAMPLE_CHARS])
+        except ClassNotFound:
+            return TextLexer()
+        finally:
+            self.remaining -= time.monotonic() - started
+
+
+def highlight_code_blocks(html_input):
+    budget = _GuessBudget(GUESS_TIME_BUDGET)
+
+    def _repl(m):
+        lang = m.group(1)
+        code = pyhtml.unescape(m.group(2) or '')
+        if lang:
+            lexer = lexer_for_alias(lang.lower())
+        else:
+            alias = guess_alias(code)
+            lexer = lexer_for_alias(alias) if alias else budget.guess(code)
+        return highlight(code, lexer, _FORMATTER)
+
+    return _CODE_BLOCK_RE.sub(_repl, html_input)
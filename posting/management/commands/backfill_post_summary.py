@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from posting.models import Post
+
+
+class Command(BaseCommand):
+    help = '为已有文章计算并写入摘要、字数与阅读时间'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--only-missing', action='store_true',
+                            help='只处理摘要为空的文章')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        qs = Post.objects.only('id', 'content', 'content_raw').order_by('pk')
+        if options['only_missing']:
+            qs = qs.filter(excerpt='')
+
+        batch = []
+        total = 0
+        for post in qs.iterator(chunk_size=batch_size):
+            post.refresh_summary()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'read_time'])
+                total += len(batch)
+                batch = []
+        if batch:
+            Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'read_time'])
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'已更新 {total} 篇文章'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from posting.transfer import export_blog
+
+
+class Command(BaseCommand):
+    help = '把用户（不含密码）、标签、文章、评论、点赞、关注与私信导出为 gzip 压缩的 NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='blog-export.ndjson.gz')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='每次从数据库读取的行数')
+
+    def handle(self, *args, **options):
+        counts = export_blog(options['output'], batch_size=options['batch_size'])
+        for label, n in counts.items():
+            self.stdout.write(f'{label}: {n}')
+        self.stdout.write(self.style.SUCCESS(f'已导出 {sum(counts.values())} 条记录到 {options["output"]}'))
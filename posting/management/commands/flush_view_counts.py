@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from posting.view_counter import flush_views
+
+
+class Command(BaseCommand):
+    help = '把缓冲的文章浏览量批量写回数据库（VIEW_COUNTER_BACKEND = "cache" 时使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=float, default=0,
+                            help='以指定秒数为间隔持续写回；默认只执行一次')
+
+    def handle(self, *args, **options):
+        interval = options['loop']
+        while True:
+            written = flush_views()
+            if written:
+                self.stdout.write(f'写回 {written} 次浏览')
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,33 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from posting.fragments import bump_posts_version
+from posting.transfer import import_blog
+
+
+class Command(BaseCommand):
+    help = '导入 export_blog 生成的文件，保留原有主键与时间，导入后重建检索索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='每批 bulk_create 的行数')
+        parser.add_argument('--ignore-conflicts', action='store_true',
+                            help='跳过主键或唯一约束冲突的记录（重跑中断的导入时使用）')
+        parser.add_argument('--skip-search-index', action='store_true',
+                            help='不重建检索索引，稍后手动运行 rebuild_search_index')
+
+    def handle(self, *args, **options):
+        try:
+            counts = import_blog(options['input'], batch_size=options['batch_size'],
+                                 ignore_conflicts=options['ignore_conflicts'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'导入失败：{e}')
+
+        for label, n in counts.items():
+            self.stdout.write(f'{label}: {n}')
+        self.stdout.write(self.style.SUCCESS(f'已处理 {sum(counts.values())} 条记录'))
+
+        # 列表页片段缓存随全局版本失效
+        bump_posts_version()
+        if not options['skip_search_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
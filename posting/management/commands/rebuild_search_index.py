@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from posting.models import Post
+from posting.search import index_post
+
+
+class Command(BaseCommand):
+    help = '为全部文章重建全文检索索引（PostTerm）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--only-missing', action='store_true',
+                            help='只处理尚未建立索引的文章')
+
+    def handle(self, *args, **options):
+        qs = Post.objects.only('id', 'title', 'content', 'content_raw').order_by('pk')
+        if options['only_missing']:
+            qs = qs.filter(search_terms__isnull=True)
+
+        total = 0
+        for post in qs.iterator(chunk_size=options['batch_size']):
+            index_post(post)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f'已为 {total} 篇文章重建索引'))
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from posting.models import Post, PostLike, Comment
+from socials.models import Follow
+from users.models import User
+from users.sessions import USER_CACHE_PREFIX
+
+
+def _count(model, field):
+    """按 field 分组计数的相关子查询，没有行时为 0。"""
+    sub = (model.objects.filter(**{field: OuterRef('pk')})
+           .order_by().values(field).annotate(c=Count('pk')).values('c'))
+    return Coalesce(Subquery(sub, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = '按实际数据重算文章与用户的冗余计数（点赞、评论、粉丝、关注、文章数）'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.update(
+            likes_count=_count(PostLike, 'post'),
+            comments_count=_count(Comment, 'post'),
+        )
+        users = User.objects.update(
+            followers_count=_count(Follow, 'followed'),
+            following_count=_count(Follow, 'follower'),
+            posts_count=_count(Post, 'author'),
+        )
+
+        # 会话缓存中的用户对象带有旧计数，一并清除
+        user_ids = User.objects.values_list('pk', flat=True).iterator(chunk_size=1000)
+        batch = []
+        for uid in user_ids:
+            batch.append(f'{USER_CACHE_PREFIX}{uid}')
+            if len(batch) >= 1000:
+                cache.delete_many(batch)
+                batch = []
+        if batch:
+            cache.delete_many(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'已重算 {posts} 篇文章、{users} 个用户的计数'))
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:56
+
+from django.db import migrations, models
+from django.utils.http import int_to_base36
+
+
+def forwards(apps, schema_editor):
+    Comment = apps.get_model('posting', 'Comment')
+    # 按层级顺序处理，保证父评论的路径总是先于子评论算出
+    assigned = {}
+    batch = []
+    for c in Comment.objects.order_by('level', 'created_at').only('id', 'parent_id', 'created_at').iterator(chunk_size=1000):
+        segment = int_to_base36(int(c.created_at.timestamp() * 1000)).rjust(9, '0') + c.id.hex[:4]
+        parent = assigned.get(c.parent_id) if c.parent_id else None
+        if parent is None:
+            c.thread_root, c.path = c.id, segment
+        else:
+            root, parent_path = parent
+            c.thread_root = root
+            c.path = parent_path + segment if len(parent_path) + len(segment) <= 255 else parent_path[:-len(segment)] + segment
+        assigned[c.id] = (c.thread_root, c.path)
+        batch.append(c)
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['thread_root', 'path'])
+            batch = []
+    if batch:
+        Comment.objects.bulk_update(batch, ['thread_root', 'path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posting', '0013_post_summary_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='thread_root',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['thread_root', 'path'], name='comment_thread_path_idx'),
+        ),
+    ]
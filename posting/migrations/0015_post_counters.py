@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:58
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field):
+    sub = (model.objects.filter(**{field: OuterRef('pk')})
+           .order_by().values(field).annotate(c=Count('pk')).values('c'))
+    return Coalesce(Subquery(sub, output_field=IntegerField()), Value(0))
+
+
+def forwards(apps, schema_editor):
+    # 初始化冗余计数；之后可随时用 reconcile_counters 命令重算
+    Post = apps.get_model('posting', 'Post')
+    PostLike = apps.get_model('posting', 'PostLike')
+    Comment = apps.get_model('posting', 'Comment')
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('socials', 'Follow')
+    Post.objects.update(likes_count=_count(PostLike, 'post'), comments_count=_count(Comment, 'post'))
+    User.objects.update(
+        followers_count=_count(Follow, 'followed'),
+        following_count=_count(Follow, 'follower'),
+        posts_count=_count(Post, 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posting', '0014_comment_thread_path'),
+        ('socials', '0001_initial'),
+        ('users', '0009_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:32
+
+from datetime import timedelta
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils.http import int_to_base36
+
+
+def dedupe_paths(apps, schema_editor):
+    Comment = apps.get_model('posting', 'Comment')
+    # 撞车的评论（保留最早的一条）改用后移若干毫秒的片段，并同步改写其后代的路径前缀
+    dupes = (
+        Comment.objects.values('post_id', 'path').annotate(n=Count('id')).filter(n__gt=1)
+        .values_list('post_id', 'path')
+    )
+    for post_id, path in list(dupes):
+        rows = list(Comment.objects.filter(post_id=post_id, path=path).order_by('created_at', 'id'))
+        taken = set(Comment.objects.filter(post_id=post_id, path__startswith=path[:-13]).values_list('path', flat=True))
+        for c in rows[1:]:
+            shift = 1
+            while True:
+                millis = int((c.created_at + timedelta(milliseconds=shift)).timestamp() * 1000)
+                new_path = path[:-13] + int_to_base36(millis).rjust(9, '0') + c.id.hex[:4]
+                if new_path not in taken:
+                    break
+                shift += 1
+            taken.add(new_path)
+            # 沿 parent 找出后代；只有路径以旧前缀开头的才需要改写（压平的深层回复不含该片段）
+            changed, frontier = [c], [c.id]
+            c.path = new_path
+            while frontier:
+                children = list(Comment.objects.filter(parent_id__in=frontier).only('id', 'path'))
+                for child in children:
+                    if child.path.startswith(path):
+                        child.path = new_path + child.path[len(path):]
+                        changed.append(child)
+                frontier = [child.id for child in children]
+            Comment.objects.bulk_update(changed, ['path'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posting', '0017_post_search_terms'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_paths, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_post_path_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='comment',
+            constraint=models.UniqueConstraint(fields=('post', 'path'), name='comment_post_path_uniq'),
+        ),
+    ]
@@ -1,8 +1,43 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.utils.http import int_to_base36
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from markdownx.utils import markdownify
 from users.models import User
 from utils.paths import pic_upload_path
+from datetime import timedelta
+import math
+import re
 import uuid
 
+# 摘要长度（字符）与阅读速度（字/分钟）
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 300
+
+_FENCED_CODE_RE = re.compile(r'```.*?```|~~~.*?~~~', re.DOTALL)
+_HTML_CODE_RE = re.compile(r'<pre[^>]*>.*?</pre>|<code[^>]*>.*?</code>', re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s+')
+# 中日韩字符按字计数，其余按连续的字母/数字串计数
+_WORD_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[^\W\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+')
+
+
+def plain_text(content: str, content_raw: str = '') -> str:
+    """把文章内容转换为去掉代码块与标签的纯文本。"""
+    source = content or ''
+    # 若没有已渲染的 HTML，回退渲染原始 Markdown
+    if not source or '<' not in source:
+        raw_fallback = content_raw or content or ''
+        if raw_fallback:
+            source = markdownify(raw_fallback)
+    source = _FENCED_CODE_RE.sub(' ', source)
+    source = _HTML_CODE_RE.sub(' ', source)
+    return _WHITESPACE_RE.sub(' ', strip_tags(source)).strip()
+
+
+def count_words(text: str) -> int:
+    return len(_WORD_RE.findall(text))
+
 # Create your models here.
 
 class Tag(models.Model):
@@ -21,6 +56,35 @@ class Post(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     tags = models.ManyToManyField('Tag', related_name='posts', blank=True)
     views_count = models.IntegerField(default=0)
+    # 冗余计数，随点赞/评论原子更新，可用 reconcile_counters 命令重算
+    likes_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    # 写入时预先计算，列表页直接读取
+    excerpt = models.CharField(max_length=255, blank=True, default='')
+    word_count = models.PositiveIntegerField(default=0)
+    read_time = models.PositiveIntegerField(default=1)  # 分钟
+
+    class Meta:
+        indexes = [
+            # 首页/全部文章按时间倒序（含游标分页），作者主页按作者 + 时间倒序
+            models.Index(fields=['-created_at'], name='post_created_idx'),
+            models.Index(fields=['author', '-created_at'], name='post_author_created_idx'),
+        ]
+
+    def refresh_summary(self):
+        """根据当前内容重新计算摘要、字数与阅读时间。"""
+        text = plain_text(self.content, self.content_raw)
+        self.excerpt = Truncator(text).chars(EXCERPT_LENGTH)
+        self.word_count = count_words(text)
+        self.read_time = max(1, math.ceil(self.word_count / WORDS_PER_MINUTE))
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields or 'content_raw' in update_fields:
+            self.refresh_summary()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'excerpt', 'word_count', 'read_time'}
+        super().save(*args, **kwargs)
 
 
 class PostLike(models.Model):
@@ -35,17 +99,106 @@ class PostLike(models.Model):
         return f"{self.user.username} likes {self.post.title}"
     
     
+# 物化路径：每级一个定长片段（9 位 base36 毫秒时间戳 + 4 位 id），按 path 排序即为线程的深度优先顺序。
+# 同一文章内 path 唯一；片段撞车（同一毫秒且 id 前 4 位相同）时把时间后移 1 毫秒重试
+PATH_SEGMENT_LENGTH = 13
+PATH_MAX_LENGTH = 255
+PATH_MAX_DEPTH = PATH_MAX_LENGTH // PATH_SEGMENT_LENGTH
+PATH_ASSIGN_RETRIES = 5
+
+
+def path_segment(comment_id, when) -> str:
+    millis = int(when.timestamp() * 1000)
+    return int_to_base36(millis).rjust(9, '0') + comment_id.hex[:4]
+
+
 class Comment(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     post = models.ForeignKey(Post, related_name='comments', on_delete=models.CASCADE)
     level = models.IntegerField(default=0)
     parent = models.ForeignKey('self', null=True, blank=True, related_name='replies', on_delete=models.CASCADE)
+    # 所在线程的顶级评论 id（顶级评论为自身）与物化路径，插入时维护
+    thread_root = models.UUIDField(null=True, blank=True)
+    path = models.CharField(max_length=PATH_MAX_LENGTH, blank=True, default='')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     content_raw = models.TextField(default='')  # 存储原始 Markdown（供客户端渲染）
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'path'], name='comment_post_path_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['thread_root', 'path'], name='comment_thread_path_idx'),
+            # 文章页分页取顶级评论；评论 API 按时间正序列出
+            models.Index(fields=['post', 'parent', '-created_at'], name='comment_post_root_idx'),
+            models.Index(fields=['post', 'created_at'], name='comment_post_created_idx'),
+        ]
+
+    def assign_path(self, shift=0):
+        """根据父评论计算 thread_root 与 path；shift 为片段时间后移的毫秒数（撞车重试用）。"""
+        segment = path_segment(self.id, (self.created_at or timezone.now()) + timedelta(milliseconds=shift))
+        if self.parent_id is None:
+            self.thread_root = self.id
+            self.path = segment
+            return
+        parent = self.parent
+        self.thread_root = parent.thread_root or parent.id
+        if len(parent.path) + PATH_SEGMENT_LENGTH <= PATH_MAX_LENGTH:
+            self.path = parent.path + segment
+        else:
+            # 超出深度上限（PATH_MAX_DEPTH 级）的回复挂在最深一级，路径上是父评论的兄弟，
+            # 不在父评论的前缀范围内；subtree() 对此单独处理，parent 外键不受影响
+            self.path = parent.path[:-PATH_SEGMENT_LENGTH] + segment
+
+    def save(self, *args, **kwargs):
+        if self.path:
+            return super().save(*args, **kwargs)
+        for shift in range(PATH_ASSIGN_RETRIES):
+            self.assign_path(shift)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # 只重试 path 撞车，其他约束错误照常抛出
+                if not Comment.objects.filter(post_id=self.post_id, path=self.path).exclude(pk=self.pk).exists():
+                    raise
+                self.path = ''
+        raise IntegrityError(f'comment path collision after {PATH_ASSIGN_RETRIES} retries')
+
+    def subtree(self):
+        """该评论及其全部后代，按线程顺序排列。
+
+        一般情况下是一次前缀范围扫描。位于最深一级的评论，其后代被压平为同级，
+        路径不以它的 path 为前缀：此时取出同一父前缀下最深一级的评论，沿 parent 找出后代。
+        """
+        qs = Comment.objects.filter(post_id=self.post_id)
+        if len(self.path) + PATH_SEGMENT_LENGTH <= PATH_MAX_LENGTH:
+            return qs.filter(path__startswith=self.path).order_by('path', 'created_at')
+        children = {}
+        siblings = qs.filter(path__startswith=self.path[:-PATH_SEGMENT_LENGTH]).values_list('id', 'parent_id')
+        for pk, parent_id in siblings:
+            children.setdefault(parent_id, []).append(pk)
+        ids, frontier = [self.pk], [self.pk]
+        while frontier:
+            frontier = [pk for parent_id in frontier for pk in children.get(parent_id, ())]
+            ids.extend(frontier)
+        return qs.filter(pk__in=ids).order_by('path', 'created_at')
+
     def __str__(self):
         return f'Comment by {self.author} on {self.post.title}' if self.level == 0 else \
             f"Comment by {self.author} on {self.post.title} (Level {self.level})"
-    
\ No newline at end of file
+    
+
+class PostTerm(models.Model):
+    """全文检索的倒排索引：某个词在某篇文章中的加权得分，由 posting.search 维护。"""
+    post = models.ForeignKey(Post, related_name='search_terms', on_delete=models.CASCADE)
+    term = models.CharField(max_length=64)
+    weight = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('term', 'post')
+
+    def __str__(self):
+        return f'{self.term} -> {self.post_id} ({self.weight})'
@@ -0,0 +1,101 @@
+"""Markdown 渲染服务：markdownify -> 代码高亮 -> bleach 清理。
+
+整条流水线的输出按 "原始 Markdown + 白名单/格式化配置" 的哈希缓存：
+先查进程内的有界 LRU，再查共享缓存（django cache），都未命中才真正渲染。
+重复保存未修改的文章、重复提交相同评论时不再触发 Pygments 与 bleach。
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from markdownx.utils import markdownify
+import bleach
+from .forms import ALLOWED_TAGS, ALLOWED_ATTRIBUTES
+from .highlighting import highlight_code_blocks, CODE_CSS_CLASS
+
+# 渲染逻辑本身变化时递增，使旧缓存全部失效
+RENDER_VERSION = 2
+RENDER_CACHE_PREFIX = 'md_render_'
+
+
+def _config_fingerprint():
+    config = {
+        'version': RENDER_VERSION,
+        'tags': sorted(ALLOWED_TAGS),
+        'attributes': {k: sorted(v) for k, v in ALLOWED_ATTRIBUTES.items()},
+        'cssclass': CODE_CSS_CLASS,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+_CONFIG_FINGERPRINT = _config_fingerprint()
+
+
+class _LRUCache:
+    """线程安全的有界 LRU，仅在当前进程内有效。"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local_cache = _LRUCache(getattr(settings, 'MARKDOWN_RENDER_LRU_SIZE', 256))
+
+
+def render_key(raw_md: str) -> str:
+    digest = hashlib.sha256(raw_md.encode('utf-8')).hexdigest()
+    return f'{RENDER_CACHE_PREFIX}{_CONFIG_FINGERPRINT}_{digest}'
+
+
+def _render_uncached(raw_md: str) -> str:
+    html = markdownify(raw_md)
+    highlighted = highlight_code_blocks(html)
+    return bleach.clean(highlighted, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+
+
+def render_markdown(raw_md: str) -> str:
+    """把原始 Markdown 渲染为经过高亮与 XSS 清理的 HTML（带缓存）。"""
+    raw_md = raw_md or ''
+    key = render_key(raw_md)
+
+    rendered = _local_cache.get(key)
+    if rendered is not None:
+        return rendered
+
+    try:
+        rendered = cache.get(key)
+    except Exception:
+        rendered = None
+
+    if rendered is None:
+        rendered = _render_uncached(raw_md)
+        try:
+            cache.set(key, rendered, timeout=getattr(settings, 'MARKDOWN_RENDER_CACHE_TIMEOUT', 24 * 3600))
+        except Exception:
+            pass
+
+    _local_cache.set(key, rendered)
+    return rendered
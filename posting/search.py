@@ -0,0 +1,178 @@
+"""文章全文检索，基于 PostTerm 倒排索引。
+
+- 分词：文本先做 NFKC 归一化、去掉变音符号并 casefold；中日韩字符串切成单字与相邻双字（bigram），
+  其余按连续的字母/数字串切词；
+- 索引：标题、标签、正文纯文本按字段加权写入 PostTerm，标签另以 "#标签名" 整体入库
+  供标签前缀检索；文章保存或标签变化时由信号登记，在事务提交后重建一次，只写入有变化的词；
+- 检索：查询词一次 IN 查询，按文章聚合，要求命中全部查询词，
+  得分 = Σ 权重 × idf，得分相同时新文章在前。
+
+只依赖普通的 (term, post) 唯一索引，MySQL 与 SQLite 上行为一致，不再需要
+前导通配符的 LIKE 扫描。
+"""
+from collections import Counter
+import math
+import re
+import unicodedata
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from .models import Post, PostTerm, plain_text
+
+TITLE_WEIGHT = 8
+TAG_WEIGHT = 10
+BODY_WEIGHT = 1
+# 正文中单个词计入的词频上限，避免堆砌关键词刷排名
+BODY_TF_CAP = 10
+TERM_MAX_LENGTH = 64
+TAG_TERM_PREFIX = '#'
+# 单次检索最多返回的文章数
+SEARCH_MAX_RESULTS = 200
+POST_TOTAL_CACHE_KEY = 'search_post_total'
+
+_CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af'
+_TOKEN_RE = re.compile(rf'[{_CJK}]+|[^\W{_CJK}]+')
+_CJK_RE = re.compile(rf'[{_CJK}]')
+
+
+def normalize(text: str) -> str:
+    """与 MySQL 默认排序规则（utf8mb4_0900_ai_ci，不区分重音与大小写）的判等保持一致。
+
+    否则 "cafe" 与 "café"、"ss" 与 "ß" 在 Python 中是两个词，写入 (term, post) 唯一索引时却相互冲突。
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return unicodedata.normalize('NFKC', text.casefold())
+
+
+def _runs(text):
+    for run in _TOKEN_RE.findall(normalize(text)):
+        yield run, bool(_CJK_RE.match(run))
+
+
+def index_tokens(text: str):
+    """用于建索引的词：中日韩串产出单字与双字，其余为整词。"""
+    tokens = []
+    for run, is_cjk in _runs(text):
+        if is_cjk:
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run[:TERM_MAX_LENGTH])
+    return tokens
+
+
+def query_terms(query: str):
+    """查询词：两字及以上的中日韩串只用双字（更精确），单字才用单字。去重后保持顺序。"""
+    terms = []
+    for run, is_cjk in _runs(query):
+        if is_cjk and len(run) > 1:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        elif is_cjk:
+            terms.append(run)
+        else:
+            terms.append(run[:TERM_MAX_LENGTH])
+    return list(dict.fromkeys(terms))
+
+
+def tag_term(name: str) -> str:
+    return (TAG_TERM_PREFIX + normalize(name).strip())[:TERM_MAX_LENGTH]
+
+
+def post_term_weights(post, tag_names) -> Counter:
+    weights = Counter()
+    for token in set(index_tokens(post.title)):
+        weights[token] += TITLE_WEIGHT
+    for name in tag_names:
+        weights[tag_term(name)] += TAG_WEIGHT
+        for token in set(index_tokens(name)):
+            weights[token] += TAG_WEIGHT
+    body = Counter(index_tokens(plain_text(post.content, post.content_raw)))
+    for token, tf in body.items():
+        weights[token] += BODY_WEIGHT * min(tf, BODY_TF_CAP)
+    return weights
+
+
+def index_post(post):
+    """更新单篇文章的索引：与已有索引比对，只删除、新增、修改有变化的词。"""
+    tag_names = list(post.tags.values_list('name', flat=True))
+    weights = post_term_weights(post, tag_names)
+    existing = {term: (pk, weight) for pk, term, weight in
+                PostTerm.objects.filter(post=post).values_list('id', 'term', 'weight')}
+
+    removed = [pk for term, (pk, _) in existing.items() if term not in weights]
+    added = [PostTerm(post=post, term=term, weight=weight)
+             for term, weight in weights.items() if term not in existing]
+    changed = [PostTerm(id=existing[term][0], weight=weight)
+               for term, weight in weights.items() if term in existing and existing[term][1] != weight]
+
+    with transaction.atomic():
+        for i in range(0, len(removed), 500):
+            PostTerm.objects.filter(id__in=removed[i:i + 500]).delete()
+        PostTerm.objects.bulk_create(added, batch_size=500)
+        PostTerm.objects.bulk_update(changed, ['weight'], batch_size=500)
+
+
+def schedule_index(post):
+    """在当前事务提交后更新文章的索引。
+
+    编辑文章时 post_save 与标签的 m2m 变化会先后触发多次，同一对象只登记一次；
+    索引失败只记录日志（robust），不影响已提交的文章保存。
+    """
+    if getattr(post, '_search_index_scheduled', False):
+        return
+    post._search_index_scheduled = True
+
+    def run():
+        post._search_index_scheduled = False
+        index_post(post)
+    transaction.on_commit(run, robust=True)
+
+
+def _post_total() -> int:
+    """文章总数，仅用于计算 idf，允许几分钟的滞后。"""
+    try:
+        total = cache.get(POST_TOTAL_CACHE_KEY)
+    except Exception:
+        total = None
+    if total is None:
+        total = Post.objects.count()
+        try:
+            cache.set(POST_TOTAL_CACHE_KEY, total, timeout=300)
+        except Exception:
+            pass
+    return total
+
+
+def search_post_ids(query: str, limit: int = SEARCH_MAX_RESULTS):
+    """按相关度返回命中全部查询词的文章 id 列表。"""
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    df = dict(
+        PostTerm.objects.filter(term__in=terms).order_by()
+        .values_list('term').annotate(n=Count('id'))
+    )
+    if len(df) < len(terms):
+        return []
+
+    total = max(_post_total(), 1)
+    score = Sum(Case(
+        *[When(term=t, then=F('weight') * Value(math.log(1 + total / df[t]))) for t in terms],
+        output_field=FloatField(),
+    ))
+    rows = (
+        PostTerm.objects.filter(term__in=terms).values('post')
+        .annotate(matched=Count('id'), score=score)
+        .filter(matched=len(terms))
+        .order_by('-score', '-post__created_at')
+        .values_list('post', flat=True)[:limit]
+    )
+    return list(rows)
+
+
+def tag_post_ids(tag: str):
+    """标签前缀检索，返回可作为子查询的文章 id queryset（走 term 索引的前缀范围扫描）。"""
+    prefix = tag_term(tag)
+    return PostTerm.objects.filter(term__startswith=prefix).values('post')
@@ -0,0 +1,76 @@
+"""评论 API 的字段投影与序列化。
+
+客户端可用 fields= 只取需要渲染的字段；查询也随之只加载对应的列，
+不需要作者信息时不再连表，不需要正文时不再读取 content / content_raw。
+"""
+from django.urls import reverse
+
+# 评论 API 可输出的字段（按输出顺序）；id 总会输出
+COMMENT_API_FIELDS = (
+    'id', 'parent', 'level', 'author', 'author_avatar', 'author_profile_url',
+    'content', 'content_raw', 'created_at',
+)
+
+# 各字段需要从数据库加载的列；id 与 created_at（游标）总会加载
+_COMMENT_FIELD_COLUMNS = {
+    'parent': ('parent',),
+    'level': ('level',),
+    'author': ('author', 'author__username'),
+    'author_avatar': ('author', 'author__avatar'),
+    'author_profile_url': ('author', 'author__username'),
+    'content': ('content',),
+    'content_raw': ('content_raw',),
+}
+_AUTHOR_FIELDS = {'author', 'author_avatar', 'author_profile_url'}
+
+
+def parse_comment_fields(raw):
+    """解析逗号分隔的 fields 参数，返回要输出的字段元组；含未知字段时返回 None。"""
+    if not raw:
+        return COMMENT_API_FIELDS
+    wanted = {f.strip() for f in raw.split(',') if f.strip()}
+    if wanted - set(COMMENT_API_FIELDS):
+        return None
+    wanted.add('id')
+    return tuple(f for f in COMMENT_API_FIELDS if f in wanted)
+
+
+def project_comments(qs, fields):
+    """让评论 queryset 只加载 fields 需要的列。"""
+    columns = {'id', 'created_at'}
+    for f in fields:
+        columns.update(_COMMENT_FIELD_COLUMNS.get(f, ()))
+    if _AUTHOR_FIELDS & set(fields):
+        qs = qs.select_related('author')
+    return qs.only(*columns)
+
+
+def comment_serializer(fields):
+    """返回把评论转换为 dict 的函数。
+
+    作者主页链接按作者记住，同一作者在整个响应中只 reverse 一次。
+    """
+    profile_urls = {}
+
+    def profile_url(c):
+        url = profile_urls.get(c.author_id)
+        if url is None:
+            url = profile_urls[c.author_id] = reverse('users:profile_user', args=[c.author.username])
+        return url
+
+    getters = {
+        'id': lambda c: str(c.id),
+        'parent': lambda c: str(c.parent_id) if c.parent_id else None,
+        'level': lambda c: c.level,
+        'author': lambda c: c.author.username,
+        'author_avatar': lambda c: c.author.avatar_url or '',
+        'author_profile_url': profile_url,
+        'content': lambda c: c.content,
+        'content_raw': lambda c: c.content_raw,
+        'created_at': lambda c: c.created_at.isoformat(),
+    }
+    selected = [(f, getters[f]) for f in fields]
+
+    def serialize(c):
+        return {f: get(c) for f, get in selected}
+    return serialize
@@ -0,0 +1,86 @@
+from django.db.models import F
+from django.utils import timezone
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from users.counters import bump_user_counters
+from .models import Post, PostLike, Comment
+from .search import schedule_index
+from .tags import tag_index
+from .stats import invalidate_author_stats, post_author_id
+from .fragments import bump_posts_version, invalidate_post_body
+
+
+def _bump_post(post_id, **deltas):
+    Post.objects.filter(pk=post_id).update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        bump_user_counters(instance.author_id, posts_count=1)
+        invalidate_author_stats(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def post_reindex(sender, instance, update_fields=None, **kwargs):
+    # 只更新计数等字段时无需重建索引；文章删除时索引随外键级联删除
+    if update_fields is None or {'title', 'content', 'content_raw'} & set(update_fields):
+        schedule_index(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_fragments_changed(sender, instance, update_fields=None, **kwargs):
+    # 列表页片段随全局版本失效；正文片段的键含 updated_at，编辑后自然换新键
+    if update_fields is None or {'title', 'content', 'content_raw', 'excerpt'} & set(update_fields):
+        bump_posts_version()
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, reverse, pk_set=None, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear') or reverse:
+        return
+    schedule_index(instance)
+    # 标签在文章保存之后才写入，正文与列表片段需要主动失效
+    invalidate_post_body(instance)
+    bump_posts_version()
+    # 只改标签也算修改：更新 updated_at，正文片段随之换新键，API 的 etag / Last-Modified 随之变化
+    if action == 'post_clear' or pk_set:
+        instance.updated_at = timezone.now()
+        Post.objects.filter(pk=instance.pk).update(updated_at=instance.updated_at)
+    # 自动完成的标签热度：增删按差量更新，clear 拿不到标签 id，等下次重载
+    if action == 'post_clear':
+        tag_index.invalidate()
+    elif pk_set:
+        tag_index.add_usage(pk_set, 1 if action == 'post_add' else -1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_user_counters(instance.author_id, posts_count=-1)
+    invalidate_author_stats(instance.author_id)
+    invalidate_post_body(instance)
+    bump_posts_version()
+
+
+@receiver(post_save, sender=PostLike)
+def like_created(sender, instance, created, **kwargs):
+    if created:
+        _bump_post(instance.post_id, likes_count=1)
+
+
+@receiver(post_delete, sender=PostLike)
+def like_deleted(sender, instance, **kwargs):
+    _bump_post(instance.post_id, likes_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        _bump_post(instance.post_id, comments_count=1)
+        invalidate_author_stats(post_author_id(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    _bump_post(instance.post_id, comments_count=-1)
+    invalidate_author_stats(post_author_id(instance.post_id))
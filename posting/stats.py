@@ -0,0 +1,54 @@
+"""作者统计：文章数、文章收到的评论总数、浏览量总和、粉丝数。
+
+未命中缓存时用一条聚合查询算出（粉丝数直接读 User 的冗余计数列），
+结果短时间缓存；发文、评论、关注等写操作通过信号主动失效。
+"""
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from .models import Post
+
+AUTHOR_STATS_PREFIX = 'author_stats_'
+
+
+def _stats_key(user_id) -> str:
+    return f'{AUTHOR_STATS_PREFIX}{user_id}'
+
+
+def get_author_stats(user) -> dict:
+    key = _stats_key(user.id)
+    try:
+        stats = cache.get(key)
+    except Exception:
+        stats = None
+    if stats is not None:
+        return stats
+
+    totals = Post.objects.filter(author=user).aggregate(
+        posts=Count('pk'), comments=Sum('comments_count'), views=Sum('views_count')
+    )
+    stats = {
+        'posts_count': totals['posts'],
+        'comments_count': totals['comments'] or 0,
+        'views_count': totals['views'] or 0,
+        'followers_count': user.followers_count,
+    }
+    try:
+        cache.set(key, stats, timeout=getattr(settings, 'AUTHOR_STATS_CACHE_TIMEOUT', 60))
+    except Exception:
+        pass
+    return stats
+
+
+def invalidate_author_stats(user_id):
+    try:
+        cache.delete(_stats_key(user_id))
+    except Exception:
+        pass
+
+
+@lru_cache(maxsize=4096)
+def post_author_id(post_id):
+    """文章作者不会变更，进程内记住 post_id -> author_id，避免评论写入时反复查询。"""
+    return Post.objects.filter(pk=post_id).values_list('author_id', flat=True).first()
@@ -0,0 +1,153 @@
+"""标签的解析、批量创建与自动完成。
+
+解析：标签名做 NFKC 归一化、去掉首尾空白与 '#' 前缀、合并连续空白，
+并按不区分大小写去重，避免 "Django"/"django " 这类近似重复的标签。
+批量：已有标签一次查询取出，缺失的一次 bulk_create（ignore_conflicts 处理并发创建），
+文章与标签的关联一次写入。
+
+自动完成：进程内维护按小写名排序的标签数组，前缀查询用 bisect 定位区间，
+结果按标签热度（关联文章数）排序。整表每 TAG_AUTOCOMPLETE_REFRESH 秒重载一次；
+在两次重载之间，本进程内新建的标签与标签关联的增减由信号增量写入，
+其他进程的变化在下次重载时可见。
+"""
+from bisect import bisect_left, insort
+from functools import reduce
+import heapq
+import operator
+import re
+import threading
+import time
+import unicodedata
+from django.conf import settings
+from django.db.models import Count, Q
+from .models import Tag
+
+AUTOCOMPLETE_LIMIT = 20
+TAG_NAME_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+_TAG_SEPARATOR_RE = re.compile(r'[,，、]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_tag_name(name: str) -> str:
+    name = unicodedata.normalize('NFKC', name or '')
+    name = _WHITESPACE_RE.sub(' ', name).strip().lstrip('#').strip()
+    return name[:TAG_NAME_MAX_LENGTH]
+
+
+def parse_tag_names(raw: str):
+    """把逗号分隔的标签串解析为归一化、去重（不区分大小写）后的名称列表，保持输入顺序。"""
+    names = {}
+    for part in _TAG_SEPARATOR_RE.split(raw or ''):
+        name = normalize_tag_name(part)
+        if name:
+            names.setdefault(name.lower(), name)
+    return list(names.values())
+
+
+def resolve_tags(names):
+    """按名称取得标签对象（不区分大小写匹配已有标签），缺失的批量创建，返回与 names 同序的列表。"""
+    if not names:
+        return []
+
+    def _fetch(wanted):
+        lookup = reduce(operator.or_, (Q(name__iexact=n) for n in wanted))
+        return {t.name.lower(): t for t in Tag.objects.filter(lookup)}
+
+    found = _fetch(names)
+    missing = [n for n in names if n.lower() not in found]
+    if missing:
+        # 并发请求可能同时创建同名标签，冲突时忽略，再查一次拿到主键
+        Tag.objects.bulk_create([Tag(name=n) for n in missing], ignore_conflicts=True)
+        found.update(_fetch(missing))
+    return [found[n.lower()] for n in names if n.lower() in found]
+
+
+def set_post_tags(post, raw, created=False):
+    """把标签串解析后关联到文章。新文章直接批量插入关联；已有文章用 set() 只写差异。"""
+    tags = resolve_tags(parse_tag_names(raw))
+    if created:
+        if tags:
+            post.tags.add(*tags)
+    else:
+        post.tags.set(tags)
+    return tags
+
+
+def _refresh_interval() -> float:
+    return getattr(settings, 'TAG_AUTOCOMPLETE_REFRESH', 300)
+
+
+class TagIndex:
+    """进程内的标签自动完成索引。
+
+    数据保存在不可变的快照 (keys, tags) 中：keys 为已排序的 (小写名, 标签 id)，
+    tags 为 {标签 id: (名称, 文章数)}。更新时在锁内复制出新快照后一次赋值替换，
+    读取方取一次 self._snapshot 即得到一致的数据，无需加锁。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = ([], {})
+        self._loaded_at = None
+
+    def _load(self):
+        rows = Tag.objects.annotate(n=Count('posts')).values_list('id', 'name', 'n')
+        tags = {tid: (name, n) for tid, name, n in rows}
+        keys = sorted((name.lower(), tid) for tid, (name, _) in tags.items())
+        with self._lock:
+            self._snapshot = (keys, tags)
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= _refresh_interval():
+            self._load()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def suggest(self, prefix: str, limit: int = AUTOCOMPLETE_LIMIT):
+        """返回以 prefix 开头（不区分大小写）的标签名，热门在前。"""
+        self._ensure_fresh()
+        keys, tags = self._snapshot
+        prefix = prefix.lower()
+        if not prefix:
+            top = heapq.nsmallest(limit, tags.values(), key=lambda t: (-t[1], t[0].lower()))
+            return [name for name, _ in top]
+
+        start = bisect_left(keys, (prefix,))
+        matches = []
+        for i in range(start, len(keys)):
+            key, tid = keys[i]
+            if not key.startswith(prefix):
+                break
+            matches.append(tags[tid])
+        top = heapq.nsmallest(limit, matches, key=lambda t: (-t[1], t[0].lower()))
+        return [name for name, _ in top]
+
+    def add_usage(self, tag_ids, delta):
+        """标签被文章关联(+1)或取消关联(-1)；本进程尚未见过的标签补查名称后插入。"""
+        if self._loaded_at is None:
+            return
+        unknown = [tid for tid in tag_ids if tid not in self._snapshot[1]]
+        names = dict(Tag.objects.filter(id__in=unknown).values_list('id', 'name')) if unknown else {}
+        with self._lock:
+            keys, tags = self._snapshot
+            tags = dict(tags)
+            new_keys = []
+            for tid in tag_ids:
+                entry = tags.get(tid)
+                if entry is None:
+                    if tid not in names:
+                        continue
+                    entry = (names[tid], 0)
+                    new_keys.append((entry[0].lower(), tid))
+                tags[tid] = (entry[0], max(0, entry[1] + delta))
+            if new_keys:
+                keys = list(keys)
+                for key in new_keys:
+                    insort(keys, key)
+            self._snapshot = (keys, tags)
+
+
+tag_index = TagIndex()
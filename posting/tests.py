@@ -1,3 +1,520 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import uuid
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, DatabaseError
+from django.db.models import F, Q
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from socials.models import Notification, Message, Conversation, Follow
+from users.models import User
+from RmsnBlog.views import _page_key
+from utils.pagination import iter_keyset, encode_cursor
+from utils.streaming import iter_json_object, iter_ndjson
+from .models import Post, Comment, Tag, PostLike, PostTerm, PATH_MAX_DEPTH
+from .comment_tree import load_comment_tree
+from .rendering import render_markdown
+from .serializers import parse_comment_fields, project_comments, comment_serializer
+from .search import normalize, index_tokens, query_terms, search_post_ids
+from .tags import TagIndex, parse_tag_names, resolve_tags
+from . import view_counter
 
-# Create your tests here.
+
+class EditPostKeepsCountersTests(TestCase):
+    """编辑文章只写标题与正文，不覆盖其他进程并发更新的计数。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(username='alice', email='alice@example.com')
+        self.user.password_encrypt('pw123456')
+        self.user.save()
+        self.client.post(reverse('users:login'), {'username': 'alice', 'password': 'pw123456'})
+        self.post = Post.objects.create(title='标题', content_raw='正文', content='<p>正文</p>', author=self.user)
+
+    def test_edit_post_keeps_counters(self):
+        url = reverse('posting:edit_post', args=[self.post.id])
+
+        def concurrent_render(raw):
+            # 本请求读出文章之后、保存之前，其他请求更新了计数
+            Post.objects.filter(pk=self.post.pk).update(
+                likes_count=F('likes_count') + 4, comments_count=F('comments_count') + 5,
+                views_count=F('views_count') + 6,
+            )
+            return render_markdown(raw)
+
+        with mock.patch('posting.views.render_markdown', side_effect=concurrent_render):
+            resp = self.client.post(url, {'title': '新标题', 'content': '新的正文', 'tags': ''})
+        self.assertEqual(resp.status_code, 302)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.title, '新标题')
+        self.assertEqual((post.likes_count, post.comments_count, post.views_count), (4, 5, 6))
+        self.assertGreater(post.updated_at, self.post.updated_at)
+
+
+class HotQueryIndexTests(TestCase):
+    """热点查询的执行计划应命中对应的组合索引，在测试所用的数据库后端上检查。"""
+
+    def hot_queries(self):
+        """与视图中热点查询同形的 queryset 及其应当命中的索引。
+
+        EXPLAIN 只看执行计划，不需要真实数据，用占位 id 即可。
+        第四项为 True 表示带布尔列等值过滤：SQLite 下 Django 把 unread=True 写成裸列条件，
+        无法走组合索引，只在 MySQL 等按 "= true" 比较的后端上检查。
+        """
+        uid, other = 1, 2
+        pid = uuid.uuid4()
+        return [
+            ('全部文章（按时间倒序）', 'post_created_idx',
+             Post.objects.order_by('-created_at', '-pk')[:6], False),
+            ('作者最近文章', 'post_author_created_idx',
+             Post.objects.filter(author_id=uid).order_by('-created_at')[:5], False),
+            ('文章页顶级评论', 'comment_post_root_idx',
+             Comment.objects.filter(post_id=pid, parent__isnull=True).order_by('-created_at')
+             .values_list('id', flat=True), False),
+            ('评论 API', 'comment_post_created_idx',
+             Comment.objects.filter(post_id=pid).order_by('created_at'), False),
+            ('通知列表', 'notif_user_created_idx',
+             Notification.objects.filter(user_id=uid).order_by('-created_at', '-pk')[:11], False),
+            ('未读通知数', 'notif_user_unread_idx',
+             Notification.objects.filter(user_id=uid, unread=True), True),
+            ('聊天记录', 'msg_pair_created_idx',
+             Message.objects.filter(Q(sender_id=uid, recipient_id=other) | Q(sender_id=other, recipient_id=uid))
+             .order_by('-created_at', '-pk')[:51], False),
+            ('未读私信数', 'msg_recipient_unread_idx',
+             Message.objects.filter(recipient_id=uid, is_read=False), True),
+            ('会话列表（user_a 一侧）', 'conv_user_a_last_idx',
+             Conversation.objects.filter(user_a_id=uid, last_message_at__isnull=False)
+             .order_by('-last_message_at').values_list('last_message_at', 'pk')[:20], False),
+            ('会话列表（user_b 一侧）', 'conv_user_b_last_idx',
+             Conversation.objects.filter(user_b_id=uid, last_message_at__isnull=False)
+             .order_by('-last_message_at').values_list('last_message_at', 'pk')[:20], False),
+        ]
+
+    def test_hot_queries_use_indexes(self):
+        for label, index_name, qs, bool_filter in self.hot_queries():
+            with self.subTest(label):
+                if bool_filter and connection.vendor == 'sqlite':
+                    continue
+                self.assertIn(index_name, qs.explain())
+
+
+class CommentStreamTests(TestCase):
+    """完整评论列表按 (created_at, id) 分批查询，输出中途出错时以错误标记收尾。"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='alice', email='alice@example.com')
+        self.post = Post.objects.create(title='标题', content_raw='正文', content='<p>正文</p>', author=self.user)
+        self.comments = [
+            Comment.objects.create(post=self.post, author=self.user, content_raw=str(i), content=str(i))
+            for i in range(7)
+        ]
+
+    def test_iter_keyset_reads_in_batches(self):
+        qs = Comment.objects.filter(post=self.post)
+        with self.assertNumQueries(4):
+            rows = list(iter_keyset(qs, chunk_size=2))
+        expected = sorted(self.comments, key=lambda c: (c.created_at, c.pk))
+        self.assertEqual([c.pk for c in rows], [c.pk for c in expected])
+
+    def test_full_list_streams_all_comments(self):
+        resp = self.client.get(reverse('posting:api_post_comments', args=[self.post.id]))
+        data = json.loads(b''.join(resp.streaming_content))
+        self.assertEqual(len(data['comments']), 7)
+        self.assertNotIn('error', data)
+
+    def test_error_sentinel(self):
+        def broken():
+            yield {'id': 1}
+            raise RuntimeError('connection lost')
+
+        with self.assertLogs('utils.streaming', 'ERROR'):
+            data = json.loads(''.join(iter_json_object(broken(), 'comments', head={'ok': True},
+                                                       tail=lambda: {'since': 'x'})))
+        self.assertEqual(data['comments'], [{'id': 1}])
+        self.assertIn('error', data)
+        self.assertNotIn('since', data)
+
+        with self.assertLogs('utils.streaming', 'ERROR'):
+            lines = ''.join(iter_ndjson(broken())).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{'id': 1}, {'error': 'stream interrupted'}])
+
+
+class ViewCounterTests(TestCase):
+    """浏览量写回失败或拿不到缓存锁时，增量保留到下一次写回，不丢失也不重复。"""
+
+    def setUp(self):
+        cache.clear()
+        view_counter._pending.clear()
+        self.user = User.objects.create(username='alice', email='alice@example.com')
+        self.post = Post.objects.create(title='标题', content_raw='正文', content='<p>正文</p>', author=self.user)
+        # 'cache' 后端只在 Redis / Memcached 上启用；测试中把本地缓存当作共享缓存
+        patcher = mock.patch('posting.view_counter.cache_is_shared', return_value=True)
+        self.shared = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def views_count(self):
+        return Post.objects.values_list('views_count', flat=True).get(pk=self.post.pk)
+
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=0)
+    def test_failed_flush_keeps_counts(self):
+        with mock.patch('posting.view_counter.apply_deltas', side_effect=DatabaseError), \
+                self.assertLogs('posting.view_counter', 'ERROR'):
+            view_counter.record_view(self.post.pk)
+            view_counter.record_view(self.post.pk)
+        self.assertEqual(view_counter.pending_views(self.post.pk), 2)
+        self.assertEqual(view_counter.flush_views(), 2)
+        self.assertEqual(self.views_count(), 2)
+
+    @override_settings(VIEW_COUNTER_BACKEND='cache')
+    def test_lock_timeout_does_not_run_unlocked(self):
+        cache.add(view_counter.LOCK_KEY, 1)
+        with mock.patch('posting.view_counter.time.sleep'):
+            # 登记不上的浏览改记在进程内
+            view_counter.record_view(self.post.pk)
+            self.assertEqual(view_counter.pending_views(self.post.pk), 1)
+            # 拿不到锁时缓存部分跳过本轮
+            self.assertEqual(view_counter._flush_cache(), 0)
+        cache.delete(view_counter.LOCK_KEY)
+        view_counter.record_view(self.post.pk)
+        self.assertEqual(view_counter.flush_views(), 2)
+        self.assertEqual(self.views_count(), 2)
+
+    @override_settings(VIEW_COUNTER_BACKEND='cache')
+    def test_cache_backend_requires_atomic_incr(self):
+        # 数据库缓存表等后端的 incr 不是原子的，改记在进程内
+        self.shared.return_value = False
+        view_counter.record_view(self.post.pk)
+        self.assertEqual(view_counter._pending[str(self.post.pk)], 1)
+        self.assertIsNone(cache.get(f'{view_counter.VIEW_COUNT_PREFIX}{self.post.pk}'))
+
+    @override_settings(VIEW_COUNTER_BACKEND='cache')
+    def test_failed_cache_flush_keeps_counts(self):
+        view_counter.record_view(self.post.pk)
+        with mock.patch('posting.view_counter.apply_deltas', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                view_counter._flush_cache()
+        self.assertEqual(view_counter.pending_views(self.post.pk), 1)
+        self.assertEqual(view_counter.flush_views(), 1)
+        self.assertEqual(self.views_count(), 1)
+
+
+class PostEtagTests(TestCase):
+    """文章 API 的 etag 只取决于已写入数据库的状态。"""
+
+    def setUp(self):
+        cache.clear()
+        view_counter._pending.clear()
+        self.user = User.objects.create(username='alice', email='alice@example.com')
+        self.post = Post.objects.create(title='标题', content_raw='正文', content='<p>正文</p>', author=self.user)
+        self.url = reverse('posting:api_post_detail', args=[self.post.id])
+
+    def tearDown(self):
+        view_counter._pending.clear()
+
+    def test_pending_views_do_not_change_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        view_counter.record_view(self.post.pk)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_tag_only_edit_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        updated_at = self.post.updated_at
+        self.post.tags.add(Tag.objects.create(name='django'))
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(json.loads(resp.content)['post']['tags'], ['django'])
+        self.assertGreater(Post.objects.get(pk=self.post.pk).updated_at, updated_at)
+
+
+class CommentPathTests(TestCase):
+    """评论物化路径在文章内唯一；超出深度上限的回复被压平后，subtree() 仍返回完整的后代。"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='alice', email='alice@example.com')
+        self.post = Post.objects.create(title='标题', content_raw='正文', content='<p>正文</p>', author=self.user)
+
+    def comment(self, parent=None, **kwargs):
+        return Comment.objects.create(post=self.post, author=self.user, content='评论', parent=parent,
+                                      level=parent.level + 1 if parent else 0, **kwargs)
+
+    def test_colliding_segments_get_distinct_paths(self):
+        # 同一毫秒、id 前 4 位相同：片段相同
+        when = timezone.now()
+        first = self.comment(id=uuid.UUID('abcd0000-0000-4000-8000-000000000001'), created_at=when)
+        second = self.comment(id=uuid.UUID('abcd0000-0000-4000-8000-000000000002'), created_at=when)
+        reply = self.comment(parent=second)
+        self.assertNotEqual(first.path, second.path)
+        self.assertEqual(list(first.subtree()), [first])
+        first.subtree().delete()
+        self.assertEqual(set(Comment.objects.values_list('pk', flat=True)), {second.pk, reply.pk})
+
+    def test_subtree_of_flattened_replies(self):
+        chain = [self.comment()]
+        for _ in range(PATH_MAX_DEPTH + 1):
+            chain.append(self.comment(parent=chain[-1]))
+        capped = chain[PATH_MAX_DEPTH - 1]
+        sibling = self.comment(parent=chain[PATH_MAX_DEPTH - 2])
+        # 最深一级以下的回复与父评论同级，不以父评论的路径为前缀
+        self.assertEqual(len(chain[-1].path), len(capped.path))
+        self.assertFalse(chain[-1].path.startswith(capped.path))
+
+        def by_path(comments):
+            # 同一毫秒内创建的评论按片段中的 id 排序，与创建顺序无关
+            return sorted(comments, key=lambda c: c.path)
+
+        self.assertEqual(list(capped.subtree()), by_path(chain[PATH_MAX_DEPTH - 1:]))
+        self.assertEqual(list(chain[0].subtree()), by_path(chain + [sibling]))
+        capped.subtree().delete()
+        self.assertTrue(Comment.objects.filter(pk=sibling.pk).exists())
+        self.assertEqual(Comment.objects.count(), PATH_MAX_DEPTH)
+
+
+class SearchTests(TestCase):
+    """全文检索的分词、去重音归一化、加权排序，以及编辑文章时只重建一次索引。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(username='alice', email='alice@example.com')
+        self.user.password_encrypt('pw123456')
+        self.user.save()
+
+    def create_post(self, title, content, tags=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title=title, content_raw=content, content=f'<p>{content}</p>',
+                                       author=self.user)
+            if tags:
+                post.tags.add(*[Tag.objects.get_or_create(name=name)[0] for name in tags.split(',')])
+        return post
+
+    def test_tokenization(self):
+        self.assertEqual(normalize('Café Straße ＰＹＴＨＯＮ'), 'cafe strasse python')
+        self.assertEqual(index_tokens('Django 全文检索'),
+                         ['django', '全', '文', '检', '索', '全文', '文检', '检索'])
+        # 查询时多字的中日韩串只用双字，单字才用单字
+        self.assertEqual(query_terms('全文检索 Django django'), ['全文', '文检', '检索', 'django'])
+        self.assertEqual(query_terms('全'), ['全'])
+
+    def test_ranking_and_all_terms_required(self):
+        in_body = self.create_post('随笔', '今天学习了全文检索')
+        in_title = self.create_post('全文检索入门', '正文')
+        self.create_post('全文', '只有一半的词')
+        self.assertEqual(search_post_ids('全文检索'), [in_title.id, in_body.id])
+
+    def test_accent_variants_share_a_term(self):
+        # MySQL 的 ai_ci 排序规则下 cafe 与 café 是同一个 term，不能各写一行
+        post = self.create_post('Café', 'cafe café CAFE')
+        self.assertEqual(list(post.search_terms.filter(term__startswith='caf').values_list('term', flat=True)), ['cafe'])
+        self.assertEqual(search_post_ids('CAFÉ'), [post.id])
+
+    def test_edit_reindexes_once(self):
+        post = self.create_post('标题', '正文', tags='旧标签')
+        self.client.post(reverse('users:login'), {'username': 'alice', 'password': 'pw123456'})
+        with mock.patch('posting.search.index_post') as index_post, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('posting:edit_post', args=[post.id]),
+                             {'title': '新标题', 'content': '新的正文', 'tags': '新标签'})
+        self.assertEqual(index_post.call_count, 1)
+
+
+class AllPostsFragmentKeyTests(TestCase):
+    """全部文章页的片段缓存键由解码后的游标构成，任意查询参数不会产生新的缓存项。"""
+
+    def test_invalid_cursor_uses_first_page_key(self):
+        self.assertEqual(_page_key('', ''), '')
+        self.assertEqual(_page_key('garbage', ''), '')
+        self.assertEqual(_page_key('', 'x' * 40), '')
+
+    def test_valid_cursor(self):
+        user = User.objects.create(username='alice', email='alice@example.com')
+        post = Post.objects.create(title='标题', content_raw='正文', content='<p>正文</p>', author=user)
+        cursor = encode_cursor(post.created_at, post.pk)
+        self.assertEqual(_page_key(cursor, ''), f'before|{post.created_at.isoformat()}|{post.pk}')
+        # before 优先，与 paginate_by_cursor 一致；无效的 before 按未传处理
+        self.assertEqual(_page_key(cursor, cursor), _page_key(cursor, ''))
+        self.assertEqual(_page_key('garbage', cursor), f'after|{post.created_at.isoformat()}|{post.pk}')
+        resp = self.client.get(reverse('all_posts'), {'before': 'garbage'})
+        self.assertContains(resp, '标题')
+
+
+class TagParsingTests(TestCase):
+    """标签串解析归一化并按不区分大小写去重；已有标签一次查询取出，缺失的批量创建。"""
+
+    def test_parse_normalizes_and_dedupes(self):
+        raw = ' #Django ，django、  Web   开发 ,,ＡＰＩ, api '
+        self.assertEqual(parse_tag_names(raw), ['Django', 'Web 开发', 'API'])
+        self.assertEqual(parse_tag_names(''), [])
+
+    def test_resolve_existing_in_one_query(self):
+        django, web = Tag.objects.create(name='Django'), Tag.objects.create(name='Web')
+        with self.assertNumQueries(1):
+            tags = resolve_tags(['web', 'DJANGO'])
+        self.assertEqual(tags, [web, django])
+
+    def test_resolve_creates_missing_in_bulk(self):
+        django = Tag.objects.create(name='Django')
+        # 查询已有、批量插入、取回新建标签，与缺失个数无关
+        with self.assertNumQueries(3):
+            tags = resolve_tags(['django', 'Redis', 'MySQL', '缓存'])
+        self.assertEqual(tags[0], django)
+        self.assertEqual([t.name for t in tags[1:]], ['Redis', 'MySQL', '缓存'])
+        self.assertEqual(Tag.objects.count(), 4)
+
+
+class TagIndexTests(TestCase):
+    """自动完成索引：增量更新替换整份快照，不修改读取方正在使用的数据。"""
+
+    def setUp(self):
+        user = User.objects.create(username='alice', email='alice@example.com')
+        self.post = Post.objects.create(title='标题', content_raw='正文', content='<p>正文</p>', author=user)
+        self.django = Tag.objects.create(name='Django')
+        self.post.tags.add(self.django)
+        self.index = TagIndex()
+
+    def test_add_usage_swaps_snapshot(self):
+        self.assertEqual(self.index.suggest('d'), ['Django'])
+        keys, tags = snapshot = self.index._snapshot
+        before = (list(keys), dict(tags))
+        docker = Tag.objects.create(name='Docker')
+        self.index.add_usage([docker.id], 1)
+        self.index.add_usage([docker.id], 1)
+        self.index.add_usage([self.django.id], -1)
+        # 旧快照保持原样，新快照包含新标签与新的热度
+        self.assertEqual((keys, tags), before)
+        self.assertIsNot(self.index._snapshot, snapshot)
+        self.assertEqual(self.index.suggest('d'), ['Docker', 'Django'])
+
+
+class ExportImportTests(TestCase):
+    """export_blog → 清空 → import_blog 后数据原样恢复：主键、时间戳、标签、评论路径与冗余计数。"""
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.bob = User.objects.create(username='bob', email='bob@example.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='全文检索', content_raw='正文', content='<p>正文</p>', author=self.alice)
+            post.tags.add(Tag.objects.create(name='Django'), Tag.objects.create(name='性能'))
+        root = Comment.objects.create(post=post, author=self.bob, content='评论')
+        Comment.objects.create(post=post, author=self.alice, content='回复', parent=root, level=1)
+        PostLike.objects.create(user=self.bob, post=post)
+        Follow.objects.create(follower=self.bob, followed=self.alice)
+        msg = Message.objects.create(sender=self.bob, recipient=self.alice, content='你好')
+        Conversation.record_message(msg)
+        self.path = os.path.join(tempfile.mkdtemp(), 'blog.ndjson.gz')
+        self.addCleanup(os.remove, self.path)
+
+    def snapshot(self):
+        return {
+            'users': list(User.objects.order_by('pk').values_list(
+                'pk', 'username', 'date_joined', 'posts_count', 'followers_count', 'following_count')),
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'title', 'created_at', 'updated_at', 'comments_count', 'likes_count', 'views_count')),
+            'tags': sorted(Post.tags.through.objects.values_list('post_id', 'tag__name')),
+            'comments': list(Comment.objects.order_by('pk').values_list(
+                'pk', 'parent_id', 'thread_root', 'path', 'level', 'created_at')),
+            'likes': list(PostLike.objects.values_list('user_id', 'post_id', 'created_at')),
+            'follows': list(Follow.objects.values_list('follower_id', 'followed_id')),
+            'messages': list(Message.objects.values_list('pk', 'sender_id', 'recipient_id', 'created_at')),
+            'conversations': list(Conversation.objects.values_list(
+                'user_a_id', 'user_b_id', 'last_message_id', 'last_message_at', 'unread_a', 'unread_b')),
+        }
+
+    def test_round_trip(self):
+        before = self.snapshot()
+        terms = set(PostTerm.objects.values_list('post_id', 'term', 'weight'))
+        call_command('export_blog', self.path, stdout=io.StringIO())
+
+        User.objects.all().delete()
+        Tag.objects.all().delete()
+        self.assertEqual(Post.objects.count(), 0)
+        call_command('import_blog', self.path, '--batch-size', '2', stdout=io.StringIO())
+
+        self.assertEqual(self.snapshot(), before)
+        # 检索索引在导入后重建
+        self.assertEqual(set(PostTerm.objects.values_list('post_id', 'term', 'weight')), terms)
+        # 不导出密码
+        self.assertEqual(User.objects.get(pk=self.alice.pk).password, '')
+
+
+class CommentFieldsTests(TestCase):
+    """评论 API 的 fields= 投影：只输出、只加载列出的字段；作者主页链接按作者只生成一次。"""
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.bob = User.objects.create(username='bob', email='bob@example.com')
+        self.post = Post.objects.create(title='标题', content_raw='正文', content='<p>正文</p>', author=self.alice)
+        for i in range(4):
+            Comment.objects.create(post=self.post, author=(self.alice, self.bob)[i % 2], content=f'评论{i}')
+        self.url = reverse('posting:api_post_comments', args=[self.post.id])
+
+    def test_parse_fields(self):
+        self.assertEqual(parse_comment_fields(''), parse_comment_fields(None))
+        self.assertEqual(parse_comment_fields('content, author'), ('id', 'author', 'content'))
+        self.assertIsNone(parse_comment_fields('content,password'))
+
+    def test_projection_limits_output_and_columns(self):
+        response = self.client.get(self.url, {'fields': 'content', 'limit': 10})
+        comments = response.json()['comments']
+        self.assertEqual(len(comments), 4)
+        self.assertEqual({tuple(c) for c in comments}, {('id', 'content')})
+        # 不需要作者时不连表，不读取原始正文
+        qs = project_comments(Comment.objects.filter(post=self.post), ('id', 'content'))
+        self.assertNotIn('JOIN', str(qs.query))
+        self.assertEqual(qs.first().get_deferred_fields() & {'content', 'content_raw'}, {'content_raw'})
+
+    def test_unknown_field_rejected(self):
+        response = self.client.get(self.url, {'fields': 'content,email'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_profile_url_reversed_once_per_author(self):
+        serialize = comment_serializer(('id', 'author_profile_url'))
+        comments = project_comments(Comment.objects.filter(post=self.post), ('id', 'author_profile_url'))
+        with mock.patch('posting.serializers.reverse', wraps=reverse) as reverse_mock:
+            urls = [serialize(c)['author_profile_url'] for c in comments]
+        self.assertEqual(reverse_mock.call_count, 2)
+        self.assertEqual(set(urls), {reverse('users:profile_user', args=[u.username]) for u in (self.alice, self.bob)})
+
+
+class CommentTreeTests(TestCase):
+    """文章页评论树：固定查询数取出当前页的全部线程，顶级评论倒序、回复正序。"""
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.bob = User.objects.create(username='bob', email='bob@example.com')
+        self.post = Post.objects.create(title='标题', content_raw='正文', content='<p>正文</p>', author=self.alice)
+        self.base = timezone.now() - timezone.timedelta(hours=1)
+        self.minute = 0
+
+    def comment(self, name, parent=None):
+        c = Comment.objects.create(post=self.post, author=(self.alice, self.bob)[self.minute % 2], content=name,
+                                   parent=parent, level=parent.level + 1 if parent else 0)
+        self.minute += 1
+        Comment.objects.filter(pk=c.pk).update(created_at=self.base + timezone.timedelta(minutes=self.minute))
+        return c
+
+    def render(self, nodes):
+        return [(c.content, c.author.username, self.render(c.tree_replies)) for c in nodes]
+
+    def test_tree_order_and_query_count(self):
+        a = self.comment('a')
+        b = self.comment('b')
+        a1 = self.comment('a1', a)
+        self.comment('b1', b)
+        self.comment('a2', a)
+        self.comment('a1x', a1)
+        self.comment('c')
+
+        # 顶级评论计数、当前页顶级 id、整页线程，与评论条数无关
+        with self.assertNumQueries(3):
+            page = load_comment_tree(self.post, 1, per_page=2)
+            tree = self.render(page.object_list)
+        self.assertEqual(tree, [('c', 'alice', []), ('b', 'bob', [('b1', 'bob', [])])])
+
+        page = load_comment_tree(self.post, 2, per_page=2)
+        self.assertEqual(self.render(page.object_list), [
+            ('a', 'alice', [('a1', 'alice', [('a1x', 'bob', [])]), ('a2', 'alice', [])]),
+        ])
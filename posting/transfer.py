@@ -0,0 +1,154 @@
+"""博客数据的整体导出与导入（manage.py export_blog / import_blog）。
+
+文件为 gzip 压缩的 NDJSON：首行是文件头，之后每行一条记录 {"model": 模型, "fields": {列名: 值}}。
+记录按依赖顺序写出（被引用的模型在前，评论按层级、父评论先于回复），
+导入时顺序读取、按模型分批 bulk_create 即可满足外键约束。
+
+- 导出按排序键分批查询 values_list()（iter_keyset），不实例化模型，内存占用与数据量无关；
+- 主键原样保留（文章、评论的 UUID，自增 id），时间戳、冗余计数、评论路径等列也原样写回；
+- 用户不导出密码与盐，导入后需通过找回密码重新设置；
+- 通知、会话令牌与检索索引不导出，检索索引在导入后重建。
+"""
+from collections import Counter
+from contextlib import contextmanager
+import datetime
+import gzip
+import json
+from django.apps import apps
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from utils.pagination import iter_keyset
+
+EXPORT_FORMAT = 'rmsnblog-export'
+EXPORT_VERSION = 1
+
+# (模型, 导出顺序, 不导出的列)；列表顺序即导入顺序
+EXPORT_MODELS = [
+    ('users.User', ('pk',), ('password', 'salt')),
+    ('posting.Tag', ('pk',), ()),
+    ('posting.Post', ('created_at', 'pk'), ()),
+    ('posting.Post_tags', ('pk',), ()),
+    # 按层级导出，保证任何回复都写在其父评论之后
+    ('posting.Comment', ('level', 'created_at', 'pk'), ()),
+    ('posting.PostLike', ('pk',), ()),
+    ('socials.Follow', ('pk',), ()),
+    ('socials.Message', ('pk',), ()),
+    ('socials.Conversation', ('pk',), ()),
+]
+
+
+class _ExportEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder 会把时间截断到毫秒，导出需保留完整精度以便原样写回。"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _export_models():
+    return [(apps.get_model(label), ordering, set(exclude)) for label, ordering, exclude in EXPORT_MODELS]
+
+
+def iter_export(batch_size=2000):
+    """依次产出文件头与全部记录（dict）。"""
+    specs = _export_models()
+    yield {'format': EXPORT_FORMAT, 'version': EXPORT_VERSION,
+           'models': [model._meta.label_lower for model, _, _ in specs]}
+    for model, ordering, exclude in specs:
+        names = [f.attname for f in model._meta.concrete_fields if f.attname not in exclude]
+        positions = [names.index(model._meta.pk.attname if f == 'pk' else f) for f in ordering]
+        rows = iter_keyset(model._default_manager.values_list(*names), ordering, chunk_size=batch_size,
+                           key=lambda row, positions=positions: tuple(row[i] for i in positions))
+        label = model._meta.label_lower
+        for row in rows:
+            yield {'model': label, 'fields': dict(zip(names, row))}
+
+
+def export_blog(path, batch_size=2000) -> Counter:
+    """导出到 path（gzip 压缩的 NDJSON），返回各模型的记录数。"""
+    counts = Counter()
+    # 大文件以速度优先，压缩级别低于 gzip 默认的 9
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as fh:
+        for record in iter_export(batch_size):
+            fh.write(json.dumps(record, cls=_ExportEncoder, ensure_ascii=False))
+            fh.write('\n')
+            if 'model' in record:
+                counts[record['model']] += 1
+    return counts
+
+
+@contextmanager
+def _keep_timestamps(models):
+    """临时关闭 auto_now / auto_now_add，否则 bulk_create 会把导入的时间覆盖为当前时间。"""
+    saved = []
+    for model in models:
+        for f in model._meta.concrete_fields:
+            if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False):
+                saved.append((f, f.auto_now, f.auto_now_add))
+                f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _reset_sequences(models):
+    """显式写入主键后同步自增序列（PostgreSQL 等需要；MySQL、SQLite 无需处理）。"""
+    statements = connection.ops.sequence_reset_sql(no_style(), list(models))
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def import_blog(path, batch_size=1000, ignore_conflicts=False) -> Counter:
+    """从 export_blog 生成的文件导入，返回各模型处理的记录数。
+
+    每批在单独的事务中写入；ignore_conflicts 为真时跳过主键或唯一约束冲突的记录（便于重跑）。
+    文件格式不符时抛出 ValueError。
+    """
+    models = {model._meta.label_lower: model for model, _, _ in _export_models()}
+    counts = Counter()
+
+    with gzip.open(path, 'rt', encoding='utf-8') as fh, _keep_timestamps(models.values()):
+        header = json.loads(fh.readline() or '{}')
+        if header.get('format') != EXPORT_FORMAT:
+            raise ValueError('不是 export_blog 导出的文件')
+        if header.get('version') != EXPORT_VERSION:
+            raise ValueError(f'不支持的导出文件版本：{header.get("version")}')
+
+        model, fields, batch = None, {}, []
+
+        def flush():
+            if batch:
+                with transaction.atomic():
+                    model._default_manager.bulk_create(batch, batch_size=batch_size,
+                                                       ignore_conflicts=ignore_conflicts)
+                counts[model._meta.label_lower] += len(batch)
+                batch.clear()
+
+        for line in fh:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            label = record.get('model')
+            if label not in models:
+                raise ValueError(f'未知的模型：{label}')
+            if models[label] is not model:
+                flush()
+                model = models[label]
+                fields = {f.attname: f for f in model._meta.concrete_fields}
+            values = record['fields']
+            unknown = values.keys() - fields.keys()
+            if unknown:
+                raise ValueError(f'{label} 不存在的列：{"、".join(sorted(unknown))}')
+            batch.append(model(**{name: fields[name].to_python(value) for name, value in values.items()}))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+    _reset_sequences(models.values())
+    return counts
@@ -0,0 +1,219 @@
+"""文章浏览量的缓冲计数。
+
+view_post 不再每次访问都写 Post 行，而是先把增量记在缓冲区里，再批量写回：
+- 'memory'：进程内累加器，由处理请求的进程按 VIEW_COUNTER_FLUSH_INTERVAL 自行写回，
+  进程退出时也会写回一次；
+- 'cache'：增量记在共享缓存中（多进程/多节点共用），由 flush_view_counts 命令
+  （可用 --loop 常驻）写回。依赖原子的 cache.incr，只在 Redis / Memcached 上启用；
+  其他后端（数据库缓存表的 incr 是先读后写，会丢失并发的浏览）下退回进程内累加器。
+
+写回时按增量分组，用 F() 原子更新，同一增量的文章只需一条 UPDATE，全部 UPDATE 在同一事务中。
+写回失败（如数据库暂时不可用）时增量放回缓冲区，等待下一次写回，不会丢失或重复计入。
+"""
+from collections import Counter, defaultdict
+import atexit
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from utils.cache import cache_is_shared
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+VIEW_COUNT_PREFIX = 'post_views_'
+DIRTY_KEY = 'post_views_dirty'
+LOCK_KEY = 'post_views_lock'
+
+_pending = Counter()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+class LockTimeout(Exception):
+    """在重试次数内没有拿到缓存锁。"""
+
+
+def _backend() -> str:
+    backend = getattr(settings, 'VIEW_COUNTER_BACKEND', 'memory')
+    if backend == 'cache' and not cache_is_shared():
+        return 'memory'
+    return backend
+
+
+def _flush_interval() -> float:
+    return getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 10)
+
+
+def apply_deltas(deltas) -> int:
+    """把 {post_id: 增量} 写回数据库，返回写入的浏览次数。"""
+    by_delta = defaultdict(list)
+    for post_id, delta in deltas.items():
+        if delta > 0:
+            by_delta[delta].append(post_id)
+    with transaction.atomic():
+        for delta, ids in by_delta.items():
+            Post.objects.filter(pk__in=ids).update(views_count=F('views_count') + delta)
+    return sum(d * len(ids) for d, ids in by_delta.items())
+
+
+# --------------------
+# 进程内累加器
+# --------------------
+def _flush_memory() -> int:
+    global _last_flush
+    with _pending_lock:
+        deltas = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    try:
+        return apply_deltas(deltas)
+    except Exception:
+        # 放回累加器，下次写回时一并写入
+        with _pending_lock:
+            _pending.update(deltas)
+        raise
+
+
+@atexit.register
+def _flush_on_exit():
+    if _pending:
+        try:
+            _flush_memory()
+        except Exception:
+            pass
+
+
+# --------------------
+# 共享缓存
+# --------------------
+def _with_lock(fn, retries=50):
+    """借助 cache.add 实现的简易互斥锁，只用于维护待写回的文章 id 集合。
+
+    重试次数内拿不到锁时抛出 LockTimeout，不在无锁的情况下读改写集合（会丢掉并发登记的 id）。
+    """
+    for _ in range(retries):
+        if cache.add(LOCK_KEY, 1, timeout=5):
+            try:
+                return fn()
+            finally:
+                cache.delete(LOCK_KEY)
+        time.sleep(0.01)
+    raise LockTimeout(LOCK_KEY)
+
+
+def _mark_dirty(*post_ids):
+    def _add():
+        ids = cache.get(DIRTY_KEY) or set()
+        ids.update(post_ids)
+        cache.set(DIRTY_KEY, ids, timeout=None)
+    _with_lock(_add)
+
+
+def _add_count(key, delta):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        return delta if cache.add(key, delta, timeout=None) else cache.incr(key, delta)
+
+
+def _record_cache(post_id):
+    key = f'{VIEW_COUNT_PREFIX}{post_id}'
+    if _add_count(key, 1) == 1:
+        try:
+            _mark_dirty(post_id)
+        except LockTimeout:
+            # 没能登记，撤销这次计数，由调用方改记在进程内
+            cache.decr(key)
+            raise
+
+
+def _flush_cache() -> int:
+    def _pop():
+        ids = cache.get(DIRTY_KEY) or set()
+        cache.delete(DIRTY_KEY)
+        return ids
+
+    try:
+        dirty = _with_lock(_pop)
+    except LockTimeout:
+        # 本轮跳过，集合原样保留给下一轮
+        return 0
+
+    deltas, remaining = {}, []
+    for post_id in dirty:
+        key = f'{VIEW_COUNT_PREFIX}{post_id}'
+        delta = cache.get(key) or 0
+        if not delta:
+            continue
+        # 用 decr 而不是 delete，期间新增的浏览不会丢；有剩余则重新登记
+        if cache.decr(key, delta) > 0:
+            remaining.append(post_id)
+        deltas[post_id] = delta
+    if remaining:
+        try:
+            _mark_dirty(*remaining)
+        except LockTimeout:
+            # 登记不上的剩余增量随本轮一起写回
+            for post_id in remaining:
+                key = f'{VIEW_COUNT_PREFIX}{post_id}'
+                rest = cache.get(key) or 0
+                if rest:
+                    cache.decr(key, rest)
+                    deltas[post_id] += rest
+
+    try:
+        return apply_deltas(deltas)
+    except Exception:
+        # 增量放回缓存并重新登记，下一轮再写
+        for post_id, delta in deltas.items():
+            _add_count(f'{VIEW_COUNT_PREFIX}{post_id}', delta)
+        _mark_dirty(*deltas)
+        raise
+
+
+# --------------------
+# 对外接口
+# --------------------
+def record_view(post_id):
+    """记录一次浏览。"""
+    post_id = str(post_id)
+    if _backend() == 'cache':
+        try:
+            _record_cache(post_id)
+            return
+        except Exception:
+            # 缓存不可用时退回进程内累加
+            pass
+    with _pending_lock:
+        _pending[post_id] += 1
+        due = time.monotonic() - _last_flush >= _flush_interval()
+    if due:
+        try:
+            _flush_memory()
+        except Exception:
+            # 写回失败不影响本次请求，增量已放回累加器
+            logger.exception('浏览量写回失败')
+
+
+def pending_views(post_id) -> int:
+    """尚未写回数据库的浏览次数，用于展示时补齐。"""
+    post_id = str(post_id)
+    pending = _pending.get(post_id, 0)
+    if _backend() == 'cache':
+        try:
+            pending += cache.get(f'{VIEW_COUNT_PREFIX}{post_id}') or 0
+        except Exception:
+            pass
+    return pending
+
+
+def flush_views() -> int:
+    """把缓冲区中的浏览量写回数据库，返回写入的浏览次数。"""
+    written = _flush_memory()
+    if _backend() == 'cache':
+        written += _flush_cache()
+    return written
@@ -2,42 +2,28 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
 from django.template.loader import render_to_string
 from users.views import get_current_user
-from .models import Post, Tag, Comment, PostLike
-from .forms import PostForm, CommentForm, ALLOWED_TAGS, ALLOWED_ATTRIBUTES
-from markdownx.utils import markdownify
-import bleach
-import re
-import html as pyhtml
-from pygments import highlight
-from pygments.lexers import get_lexer_by_name, guess_lexer
-from pygments.formatters import HtmlFormatter
-from pygments.util import ClassNotFound
+from .models import Post, Comment, PostLike
+from .forms import PostForm, CommentForm
+from .rendering import render_markdown
+from .view_counter import record_view, pending_views
+from .comment_tree import load_comment_tree
+from .fragments import fragment_timeout, post_body_version, comments_version
+from .search import search_post_ids, tag_post_ids
+from .tags import tag_index, parse_tag_names, set_post_tags
+from .serializers import COMMENT_API_FIELDS, parse_comment_fields, project_comments, comment_serializer
+from utils.pagination import paginate_by_cursor, encode_cursor, decode_cursor, iter_keyset
+from utils.streaming import StreamingJsonResponse, StreamingNdjsonResponse
 import json
-from django.utils.html import strip_tags
+from django.utils.functional import SimpleLazyObject
 from django.utils.text import Truncator
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_http_methods, condition
+from django.db import transaction
+from django.db.models import Count, Max
 from django.urls import reverse
 
 
-def highlight_code_blocks(html_input):
-    fmt = HtmlFormatter(cssclass='codehilite')
-    pattern = re.compile(r'<pre><code(?: class="language-([^"]+)")?>(.*?)</code></pre>', re.DOTALL)
-    def _repl(m):
-        lang = m.group(1)
-        code = pyhtml.unescape(m.group(2) or '')
-        try:
-            if lang:
-                lexer = get_lexer_by_name(lang, stripall=True)
-            else:
-                lexer = guess_lexer(code)
-        except ClassNotFound:
-            from pygments.lexers.special import TextLexer
-            lexer = TextLexer()
-        return highlight(code, lexer, fmt)
-    return pattern.sub(_repl, html_input)
-
-
 def new_post(request):
     """发布新文章"""
     user = get_current_user(request)
@@ -52,37 +38,24 @@ def new_post(request):
         if not raw_md:
             # content 为空，重新渲染表单并显示错误
             form.add_error('content', '文章内容不能为空')
-            tags_raw = request.POST.get('tags', '')
-            tags_list = [t.strip() for t in tags_raw.split(',') if t.strip()]
+            tags_list = parse_tag_names(request.POST.get('tags', ''))
             return render(request, 'new_post.html', {'form': form, 'initial_tags_json': json.dumps(tags_list)})
         
         if form.is_valid():
             post = form.save(commit=False)
             post.content_raw = raw_md
-            # 将 Markdown 渲染为 HTML 并清理 XSS
-            html = markdownify(raw_md)
-            # Server-side syntax highlighting (applies module-level helper)
-            highlighted = highlight_code_blocks(html)
-            cleaned = bleach.clean(highlighted, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
-            post.content = cleaned
+            # 将 Markdown 渲染为 HTML（含代码高亮）并清理 XSS
+            post.content = render_markdown(raw_md)
             post.author = user
-            post.save()
-            # 解析并创建/关联自定义标签（前端通过隐藏字段提交逗号分隔的标签名）
-            tags_raw = request.POST.get('tags', '')
-            if tags_raw:
-                tag_names = [t.strip() for t in tags_raw.split(',') if t.strip()]
-                tag_objs = []
-                for name in tag_names:
-                    tag_obj, _ = Tag.objects.get_or_create(name=name)
-                    tag_objs.append(tag_obj)
-                post.tags.set(tag_objs)
-            else:
-                post.tags.clear()
+            # 文章与标签在同一事务中写入，检索索引在提交后只重建一次
+            with transaction.atomic():
+                post.save()
+                # 解析并批量创建/关联自定义标签（前端通过隐藏字段提交逗号分隔的标签名）
+                set_post_tags(post, request.POST.get('tags', ''), created=True)
             return redirect('users:dashboard')
         else:
             # 将前端 tags 回显数据也交给模板（视图负责准备初始标签数据）
-            tags_raw = request.POST.get('tags', '')
-            tags_list = [t.strip() for t in tags_raw.split(',') if t.strip()]
+            tags_list = parse_tag_names(request.POST.get('tags', ''))
             return render(request, 'new_post.html', {'form': form, 'initial_tags_json': json.dumps(tags_list)})
 
     form = PostForm()
@@ -108,36 +81,23 @@ def edit_post(request, post_id):
         if not raw_md:
             # content 为空，重新渲染表单并显示错误
             form.add_error('content', '文章内容不能为空')
-            tags_raw = request.POST.get('tags', '')
-            tags_list = [t.strip() for t in tags_raw.split(',') if t.strip()]
+            tags_list = parse_tag_names(request.POST.get('tags', ''))
             return render(request, 'edit_post.html', {'post': post, 'form': form, 'initial_tags_json': json.dumps(tags_list)})
         
         if form.is_valid():
             post = form.save(commit=False)
             # 获取表单中的 content（原始 Markdown）
             post.content_raw = raw_md
-            # 将 Markdown 渲染为 HTML 并清理 XSS
-            html = markdownify(raw_md)
-            # 高亮后清理
-            highlighted = highlight_code_blocks(html)
-            cleaned = bleach.clean(highlighted, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
-            post.content = cleaned
-            post.save()
-            # 更新标签
-            tags_raw = request.POST.get('tags', '')
-            if tags_raw:
-                tag_names = [t.strip() for t in tags_raw.split(',') if t.strip()]
-                tag_objs = []
-                for name in tag_names:
-                    tag_obj, _ = Tag.objects.get_or_create(name=name)
-                    tag_objs.append(tag_obj)
-                post.tags.set(tag_objs)
-            else:
-                post.tags.clear()
+            # 将 Markdown 渲染为 HTML（含代码高亮）并清理 XSS
+            post.content = render_markdown(raw_md)
+            with transaction.atomic():
+                # 只写编辑涉及的列，避免覆盖并发更新的点赞、评论、浏览计数（摘要等列由 Post.save 补上）
+                post.save(update_fields=['title', 'content_raw', 'content', 'updated_at'])
+                # 更新标签（只写入与原有标签的差异）
+                set_post_tags(post, request.POST.get('tags', ''))
             return redirect('users:dashboard')
         else:
-            tags_raw = request.POST.get('tags', '')
-            tags_list = [t.strip() for t in tags_raw.split(',') if t.strip()]
+            tags_list = parse_tag_names(request.POST.get('tags', ''))
             return render(request, 'edit_post.html', {'post': post, 'form': form, 'initial_tags_json': json.dumps(tags_list)})
     
     # 预构建初始标签数据，以便模板不需要进行复杂的 tags 拼接
@@ -153,27 +113,18 @@ def view_post(request, post_id):
     """查看文章详情"""
     post = get_object_or_404(Post, id=post_id)
     
-    # 增加浏览量计数
-    post.views_count += 1
-    post.save(update_fields=['views_count'])
+    # 增加浏览量计数：先记入缓冲区，再批量写回数据库
+    record_view(post.id)
+    post.views_count += pending_views(post.id)
     
     # 将标签列表与是否有更新之类的轻量信息在视图中计算好，简化模板判断
-    tags = list(post.tags.values_list('name', flat=True))
+    # 标签与评论只在对应片段未命中缓存时才查询
+    tags = SimpleLazyObject(lambda: list(post.tags.values_list('name', flat=True)))
     is_updated = post.updated_at != post.created_at
     
-    # 计算预计阅读时间（字数/300，向上取整）
-    import math
-    content_text = post.content_raw if hasattr(post, 'content_raw') and post.content_raw else post.content
-    word_count = len(content_text)
-    read_time = math.ceil(word_count / 300) if word_count > 0 else 1
-
-    # 评论与文章为独立模型时，不应依赖反向属性，改为直接查询 Comment
-    # 查询顶级评论并预加载所有相关数据
-    comments = Comment.objects.filter(post=post, level=0).order_by('-created_at').prefetch_related(
-        'author',
-        'replies',
-        'replies__author'
-    )
+    # 一次查询取出全部评论并在内存中组装成树，按顶级评论分页
+    cpage = request.GET.get('cpage', 1)
+    comments_page = SimpleLazyObject(lambda: load_comment_tree(post, cpage))
     
     # 获取当前用户
     user = get_current_user(request)
@@ -188,12 +139,17 @@ def view_post(request, post_id):
 
     context = {
         'post': post,
-        'comments': comments,
+        'comments_page': comments_page,
         'tags': tags,
         'is_updated': is_updated,
         'user': user,
         'user_liked': user_liked,
-        'read_time': read_time,
+        'read_time': post.read_time,
+        'fragment_timeout': fragment_timeout(),
+        'post_version': post_body_version(post),
+        # 评论区片段只对未登录访客缓存（登录用户的回复、删除按钮与 CSRF token 因人而异）
+        'comments_version': None if user else comments_version(post),
+        'cpage': cpage,
     }
     return render(request, 'post_detail.html', context)
 
@@ -230,9 +186,7 @@ def add_comment(request, post_id):
         return redirect('users:login')
 
     raw_md = form.cleaned_data['content']
-    html = markdownify(raw_md)
-    highlighted = highlight_code_blocks(html)
-    cleaned = bleach.clean(highlighted, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+    cleaned = render_markdown(raw_md)
 
     comment = Comment.objects.create(
         post=post,
@@ -243,18 +197,14 @@ def add_comment(request, post_id):
         content=cleaned,
     )
 
-    # 创建通知：如果发表评论的人不是文章作者，通知文章作者
+    # 创建通知（交给通知队列异步写入）：如果发表评论的人不是文章作者，通知文章作者
     try:
-        from socials.models import Notification
-        from django.contrib.contenttypes.models import ContentType
+        from socials.notifications import notify
         # 通知文章作者，target 指向 Post
-        if post.author.id != user.id:
-            ct = ContentType.objects.get_for_model(post.__class__)
-            Notification.objects.create(user=post.author, actor=user, verb='评论了你的文章', target_content_type=ct, target_object_id=str(post.id))
+        notify(post.author_id, user.id, '评论了你的文章', target=post)
         # 如果是回复，通知父评论作者（且不重复通知文章作者）
-        if parent and parent.author.id != user.id and parent.author.id != post.author.id:
-            ct_c = ContentType.objects.get_for_model(parent.__class__)
-            Notification.objects.create(user=parent.author, actor=user, verb='回复了你的评论', target_content_type=ct_c, target_object_id=str(parent.id))
+        if parent and parent.author_id != post.author_id:
+            notify(parent.author_id, user.id, '回复了你的评论', target=parent)
     except Exception:
         pass
 
@@ -280,20 +230,18 @@ def toggle_like(request, post_id):
             liked = False
         else:
             liked = True
-            # 创建通知给文章作者
+            # 创建通知给文章作者（交给通知队列，反复点赞/取消会被合并）
             try:
-                from socials.models import Notification
-                from django.contrib.contenttypes.models import ContentType
-                ct = ContentType.objects.get_for_model(post.__class__)
-                if post.author.id != user.id:
-                    Notification.objects.create(user=post.author, actor=user, verb='点赞了你的文章', target_content_type=ct, target_object_id=str(post.id))
+                from socials.notifications import notify
+                notify(post.author_id, user.id, '点赞了你的文章', target=post)
             except Exception:
                 pass
     except Exception:
         return JsonResponse({'ok': False, 'error': '操作失败'}, status=500)
 
-    count = PostLike.objects.filter(post=post).count()
-    return JsonResponse({'ok': True, 'liked': liked, 'likes_count': count})
+    # likes_count 由信号随点赞/取消原子更新，这里只需按主键回读
+    post.refresh_from_db(fields=['likes_count'])
+    return JsonResponse({'ok': True, 'liked': liked, 'likes_count': post.likes_count})
 
 def delete_post(request, post_id):
     """删除文章"""
@@ -316,15 +264,15 @@ def delete_post(request, post_id):
 
 
 def tags_autocomplete(request):
-    """返回与查询 q 匹配的标签名列表（JSON），用于前端自动完成建议。"""
+    """返回以 q 开头的标签名列表（JSON，热门在前），用于前端自动完成建议。"""
+    from django.conf import settings
+    from django.utils.cache import patch_cache_control
     q = request.GET.get('q', '').strip()
-    results = []
-    if q:
-        qs = Tag.objects.filter(name__icontains=q).order_by('name')[:20]
-    else:
-        qs = Tag.objects.all().order_by('name')[:20]
-    results = [t.name for t in qs]
-    return JsonResponse({'ok': True, 'results': results})
+    results = tag_index.suggest(q)
+    response = JsonResponse({'ok': True, 'results': results})
+    # 结果与用户无关，允许浏览器与中间缓存短时间复用
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'TAG_AUTOCOMPLETE_MAX_AGE', 60))
+    return response
 
 
 def delete_comment(request, comment_id):
@@ -344,8 +292,8 @@ def delete_comment(request, comment_id):
             return JsonResponse({'ok': False, 'error': '无权删除此评论'}, status=403)
         return redirect('posting:view_post', post_id=post.id)
     
-    # 删除评论（级联删除所有回复）
-    comment.delete()
+    # 按路径前缀取出整个子树一次删除（含压平的深层回复，见 Comment.subtree）
+    comment.subtree().delete()
     
     # AJAX 请求返回 JSON
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
@@ -356,8 +304,7 @@ def delete_comment(request, comment_id):
 
 
 def search_posts(request):
-    """搜索文章（按标题或标签）- 仅限登录用户"""
-    from django.db.models import Q
+    """搜索文章（全文检索或标签）- 仅限登录用户"""
     from django.core.paginator import Paginator
     from django.urls import reverse
     
@@ -367,56 +314,27 @@ def search_posts(request):
     
     query = request.GET.get('q', '').strip()
     posts = []
-    paginator = None
     page_obj = None
+    ranked = False
+    results = []
     
     if query:
-        # 如果以 # 开头 -> 标签搜索（去掉前缀）；否则仅按标题搜索
+        base = Post.objects.defer('content', 'content_raw').select_related('author').prefetch_related('tags')
+        # 如果以 # 开头 -> 标签前缀搜索（去掉前缀），按时间倒序游标分页；否则全文检索，按相关度分页
         if query.startswith('#'):
             tag = query.lstrip('#').strip()
-            if tag:
-                qs = Post.objects.filter(
-                    Q(tags__name__icontains=tag)
-                ).distinct().select_related('author').prefetch_related('tags').order_by('-created_at')
-            else:
-                qs = Post.objects.none()
+            qs = base.filter(id__in=tag_post_ids(tag)) if tag else Post.objects.none()
+            page_obj = paginate_by_cursor(qs, before=request.GET.get('before'), after=request.GET.get('after'), per_page=10)
+            results = page_obj.object_list
         else:
-            # 限制查询内容，移除明显的特殊字符以防注入或无效查询
-            import re
-            safe_q = re.sub(r'[^\w\u4e00-\u9fff\s\-_:,\.\(\)]+', '', query)
-            if not safe_q:
-                qs = Post.objects.none()
-            else:
-                qs = Post.objects.filter(
-                    Q(title__icontains=safe_q)
-                ).distinct().select_related('author').prefetch_related('tags').order_by('-created_at')
-        
-        # 分页，每页 10 个
-        paginator = Paginator(qs, 10)
-        page_num = request.GET.get('page', 1)
-        page_obj = paginator.get_page(page_num)
+            ranked = True
+            page_obj = Paginator(search_post_ids(query), 10).get_page(request.GET.get('page', 1))
+            by_id = base.in_bulk(list(page_obj.object_list))
+            results = [by_id[pid] for pid in page_obj.object_list if pid in by_id]
         
         # 预处理数据
-        for p in page_obj:
-            # 生成摘要：优先使用已渲染的 HTML（p.content），若为空或看起来不是 HTML，则回退渲染 p.content_raw
-            import re
-            content_source = p.content or ''
-            if not content_source or '<' not in content_source:
-                # 如果没有已渲染的 HTML，则把可用的原始 Markdown（优先 content_raw，回退为 p.content）渲染为 HTML
-                raw_fallback = getattr(p, 'content_raw', '') or p.content or ''
-                if raw_fallback:
-                    content_source = markdownify(raw_fallback)
-                else:
-                    content_source = p.content or ''
-
-            # 额外清理：如果有 Markdown 围栏代码（```...``` 或 ~~~...~~~），先移除它们
-            content_source = re.sub(r'```.*?```', ' ', content_source, flags=re.DOTALL)
-            content_source = re.sub(r'~~~.*?~~~', ' ', content_source, flags=re.DOTALL)
-
-            # 移除代码块（<pre>）再生成纯文本摘要
-            clean_no_pre = re.sub(r'<pre[^>]*>.*?</pre>', ' ', content_source, flags=re.DOTALL)
-            clean_content = re.sub(r'\s+', ' ', strip_tags(clean_no_pre)).strip()
-            excerpt = Truncator(clean_content).chars(140)
+        for p in results:
+            excerpt = Truncator(p.excerpt).chars(140)
             
             # 获取作者头像 URL
             author_avatar = p.author.avatar.url if p.author.avatar else None
@@ -438,7 +356,7 @@ def search_posts(request):
         'query': query,
         'posts': posts,
         'page_obj': page_obj,
-        'paginator': paginator,
+        'ranked': ranked,
     }
     return render(request, 'search_results.html', context)
 
@@ -446,6 +364,58 @@ def search_posts(request):
 # --------------------
 # 解耦后的API视图
 # --------------------
+# since 增量同步单次最多返回的评论数
+COMMENT_SYNC_MAX = 200
+
+# ---- 条件请求（ETag / Last-Modified）----
+# 校验值只用一条轻量查询得出，命中 If-None-Match / If-Modified-Since 时直接返回 304，
+# 不再加载作者、标签或序列化评论。同一请求内 etag 与 last_modified 共用一次查询结果。
+# 响应带 Cache-Control: no-cache，浏览器每次都会带上校验值重新验证。
+
+def _post_validators(request, post_id):
+    if not hasattr(request, '_post_validators'):
+        request._post_validators = (
+            Post.objects.filter(pk=post_id).values_list('updated_at', 'views_count').first()
+        )
+    return request._post_validators
+
+
+def _post_etag(request, post_id):
+    row = _post_validators(request, post_id)
+    if row is None:
+        return None
+    updated_at, views_count = row
+    # 只取已写入数据库的状态：浏览量不更新 updated_at，需计入 etag；
+    # 缓冲中尚未写回的浏览量只在本进程可见，计入后各进程给出的 etag 不一致
+    return f'{post_id}-{updated_at.timestamp():.6f}-{views_count}'
+
+
+def _post_last_modified(request, post_id):
+    row = _post_validators(request, post_id)
+    return row[0] if row else None
+
+
+def _comments_validators(request, post_id):
+    if not hasattr(request, '_comments_validators'):
+        request._comments_validators = Comment.objects.filter(post_id=post_id).aggregate(
+            latest=Max('created_at'), count=Count('id')
+        )
+    return request._comments_validators
+
+
+def _comments_etag(request, post_id):
+    # 删除评论不会改变最新评论时间，因此同时计入评论数
+    v = _comments_validators(request, post_id)
+    latest = v['latest'].timestamp() if v['latest'] else 0
+    return f'{post_id}-c{v["count"]}-{latest:.6f}'
+
+
+def _comments_last_modified(request, post_id):
+    return _comments_validators(request, post_id)['latest']
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_post_etag, last_modified_func=_post_last_modified)
 def api_post_detail(request, post_id):
     """返回文章的 JSON 表示，包含原始 Markdown 与已渲染 HTML。"""
     post = get_object_or_404(Post, id=post_id)
@@ -459,29 +429,74 @@ def api_post_detail(request, post_id):
         'tags': list(post.tags.values_list('name', flat=True)),
         'created_at': post.created_at.isoformat(),
         'updated_at': post.updated_at.isoformat(),
+        # 与 etag 一致，只返回已写回数据库的浏览量
         'views_count': post.views_count,
     }
     return JsonResponse({'ok': True, 'post': data})
 
 
+@cache_control(no_cache=True)
+@condition(etag_func=_comments_etag, last_modified_func=_comments_last_modified)
 def api_post_comments(request, post_id):
-    """返回文章下的所有评论（扁平列表），供前端渲染线程或树结构。"""
+    """返回文章下的评论（扁平列表，按时间正序），供前端渲染线程或树结构。
+
+    - 传入 limit 时按游标分页：默认返回最新的 limit 条，before/after 为上一次响应中的游标；
+    - 传入 since 时增量同步：只返回该游标之后的新评论（每次最多 COMMENT_SYNC_MAX 条，
+      has_more 为真时用响应中的 since 继续拉取）；不分页的完整响应同样带 since，作为同步起点；
+    - fields=id,author,content 只返回列出的字段（id 总会返回），可选字段见 COMMENT_API_FIELDS；
+    - 不分页的完整列表逐行流式输出；format=ndjson 时每行一条评论（application/x-ndjson），便于导出。
+      输出中途出错时以 "error" 字段（NDJSON 为最后一行 {"error": ...}）收尾，见 utils.streaming。
+    """
     post = get_object_or_404(Post, id=post_id)
-    qs = Comment.objects.filter(post=post).order_by('created_at').select_related('author', 'parent')
-    comments = []
-    for c in qs:
-        comments.append({
-            'id': str(c.id),
-            'parent': str(c.parent.id) if c.parent else None,
-            'level': c.level,
-            'author': c.author.username,
-            'author_avatar': c.author.avatar_url if getattr(c.author, 'avatar_url', None) else '',
-            'author_profile_url': reverse('users:profile_user', args=[c.author.username]),
-            'content': c.content,
-            'content_raw': getattr(c, 'content_raw', c.content),
-            'created_at': c.created_at.isoformat(),
+    fields = parse_comment_fields(request.GET.get('fields'))
+    if fields is None:
+        return JsonResponse({'ok': False, 'error': 'unknown fields',
+                             'allowed': list(COMMENT_API_FIELDS)}, status=400)
+    qs = project_comments(Comment.objects.filter(post=post), fields)
+    serialize = comment_serializer(fields)
+
+    since = request.GET.get('since')
+    if since:
+        if decode_cursor(since, Comment) is None:
+            return JsonResponse({'ok': False, 'error': 'invalid cursor'}, status=400)
+        page = paginate_by_cursor(qs, after=since, per_page=COMMENT_SYNC_MAX, display='asc')
+        rows = page.object_list
+        return JsonResponse({
+            'ok': True,
+            'comments': [serialize(c) for c in rows],
+            # 没有新评论时原样返回，客户端下次继续使用
+            'since': encode_cursor(rows[-1].created_at, rows[-1].pk) if rows else since,
+            'has_more': page.has_newer,
         })
-    return JsonResponse({'ok': True, 'comments': comments})
+
+    try:
+        limit = int(request.GET.get('limit', 0))
+    except ValueError:
+        limit = 0
+    if limit > 0:
+        page = paginate_by_cursor(qs, before=request.GET.get('before'), after=request.GET.get('after'),
+                                  per_page=min(limit, 200), display='asc')
+        return JsonResponse({
+            'ok': True,
+            'comments': [serialize(c) for c in page.object_list],
+            'cursors': {'older': page.older_cursor, 'newer': page.newer_cursor},
+        })
+
+    # 完整列表：按 (created_at, id) 分批查询、逐条编码输出，不在内存中拼出整个列表
+    last = {}
+
+    def stream():
+        for c in iter_keyset(qs):
+            last['comment'] = c
+            yield serialize(c)
+
+    def tail():
+        c = last.get('comment')
+        return {'since': encode_cursor(c.created_at, c.pk) if c else None}
+
+    if request.GET.get('format') == 'ndjson':
+        return StreamingNdjsonResponse(stream())
+    return StreamingJsonResponse(stream(), 'comments', head={'ok': True}, tail=tail)
 
 
 @csrf_exempt
@@ -513,9 +528,7 @@ def api_add_comment_api(request, post_id):
     if not user:
         return JsonResponse({'ok': False, 'error': 'authentication required'}, status=401)
 
-    html = markdownify(raw_md)
-    highlighted = highlight_code_blocks(html)
-    cleaned = bleach.clean(highlighted, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+    cleaned = render_markdown(raw_md)
 
     comment = Comment.objects.create(
         post=post,
@@ -526,18 +539,14 @@ def api_add_comment_api(request, post_id):
         content=cleaned,
     )
 
-    # 创建通知：如果发表评论的人不是文章作者，通知文章作者
+    # 创建通知（交给通知队列异步写入）：如果发表评论的人不是文章作者，通知文章作者
     try:
-        from socials.models import Notification
-        from django.contrib.contenttypes.models import ContentType
+        from socials.notifications import notify
         # 通知文章作者，target 指向 Post
-        if post.author.id != user.id:
-            ct = ContentType.objects.get_for_model(post.__class__)
-            Notification.objects.create(user=post.author, actor=user, verb='评论了你的文章', target_content_type=ct, target_object_id=str(post.id))
+        notify(post.author_id, user.id, '评论了你的文章', target=post)
         # 如果是回复，通知父评论作者（且不重复通知文章作者）
-        if parent and parent.author.id != user.id and parent.author.id != post.author.id:
-            ct_c = ContentType.objects.get_for_model(parent.__class__)
-            Notification.objects.create(user=parent.author, actor=user, verb='回复了你的评论', target_content_type=ct_c, target_object_id=str(parent.id))
+        if parent and parent.author_id != post.author_id:
+            notify(parent.author_id, user.id, '回复了你的评论', target=parent)
     except Exception:
         pass
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Follow, Notification, Message
+from .models import Follow, Notification, Message, Conversation
 
 
 @admin.register(Follow)
@@ -22,3 +22,9 @@ class MessageAdmin(admin.ModelAdmin):
 from django.contrib import admin
 
 # Register your models here.
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('user_a', 'user_b', 'last_message_at', 'unread_a', 'unread_b')
+    search_fields = ('user_a__username', 'user_b__username')
@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def realtime(request):
+    """模板中是否启用未读计数的 SSE 推送（仅在 ASGI 部署时开启）。"""
+    return {'UNREAD_STREAM_ENABLED': getattr(settings, 'UNREAD_STREAM_ENABLED', False)}
@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from socials.notifications import process_events, EVENT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = '消费通知事件队列，批量写入通知（NOTIFICATION_DISPATCH = "queue" 时需常驻运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EVENT_BATCH_SIZE)
+        parser.add_argument('--loop', type=float, default=0,
+                            help='队列为空时等待指定秒数后继续；默认处理完当前队列即退出')
+
+    def handle(self, *args, **options):
+        interval = options['loop']
+        while True:
+            handled, created = process_events(options['batch_size'])
+            if handled:
+                self.stdout.write(f'处理 {handled} 个事件，新建 {created} 条通知')
+                continue
+            if not interval:
+                break
+            time.sleep(interval)
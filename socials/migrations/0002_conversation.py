@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def forwards(apps, schema_editor):
+    """根据已有私信生成会话记录。"""
+    Message = apps.get_model('socials', 'Message')
+    Conversation = apps.get_model('socials', 'Conversation')
+    convs = {}
+    for m in Message.objects.order_by('created_at').only('id', 'sender_id', 'recipient_id', 'created_at', 'is_read').iterator(chunk_size=2000):
+        if m.sender_id == m.recipient_id:
+            continue
+        a, b = sorted((m.sender_id, m.recipient_id))
+        conv = convs.get((a, b))
+        if conv is None:
+            conv = convs[(a, b)] = Conversation(user_a_id=a, user_b_id=b)
+        conv.last_message_id = m.id
+        conv.last_message_at = m.created_at
+        if not m.is_read:
+            if m.recipient_id == a:
+                conv.unread_a += 1
+            else:
+                conv.unread_b += 1
+    Conversation.objects.bulk_create(convs.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_user_counters'),
+        ('socials', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_a', models.IntegerField(default=0)),
+                ('unread_b', models.IntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='socials.message')),
+                ('user_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_a', to='users.user')),
+                ('user_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_b', to='users.user')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_a', '-last_message_at'], name='conv_user_a_last_idx'), models.Index(fields=['user_b', '-last_message_at'], name='conv_user_b_last_idx')],
+                'unique_together': {('user_a', 'user_b')},
+            },
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F, Q
 from django.utils import timezone
 from users.models import User
 from django.contrib.contenttypes.models import ContentType
@@ -27,11 +28,34 @@ class Notification(models.Model):
     target = GenericForeignKey('target_content_type', 'target_object_id')
     unread = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # 聚合通知：触发者总数与最近几位触发者的 id（actor 为最近一位），旧数据为空列表
+    actor_count = models.IntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            # 通知列表按时间倒序；未读数统计与"全部已读"按 (user, unread) 过滤
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+            models.Index(fields=['user', 'unread'], name='notif_user_unread_idx'),
+        ]
 
     def __str__(self):
         return f"Notify {self.user.username}: {self.verb}"
 
 
+class NotificationEvent(models.Model):
+    """待处理的通知事件队列，由 process_notifications 命令批量写成 Notification。"""
+    user = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    actor = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE, null=True, blank=True)
+    verb = models.CharField(max_length=140)
+    target_content_type = models.ForeignKey(ContentType, null=True, blank=True, on_delete=models.CASCADE)
+    target_object_id = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Event for {self.user_id}: {self.verb}"
+
+
 class Message(models.Model):
     sender = models.ForeignKey(User, related_name='sent_messages', on_delete=models.CASCADE)
     recipient = models.ForeignKey(User, related_name='received_messages', on_delete=models.CASCADE)
@@ -39,8 +63,98 @@ class Message(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # 聊天记录按 (发送者, 接收者) 两个方向取并按时间排序，标记已读同样走该索引
+            models.Index(fields=['sender', 'recipient', 'created_at'], name='msg_pair_created_idx'),
+            # 未读私信数
+            models.Index(fields=['recipient', 'is_read'], name='msg_recipient_unread_idx'),
+        ]
+
     def __str__(self):
         return f"Message from {self.sender.username} to {self.recipient.username} @ {self.created_at.isoformat()}"
-from django.db import models
 
-# Create your models here.
+
+class Conversation(models.Model):
+    """两个用户之间的私信会话（user_a 为 id 较小的一方），由 send_message 与已读标记维护。"""
+    user_a = models.ForeignKey(User, related_name='conversations_as_a', on_delete=models.CASCADE)
+    user_b = models.ForeignKey(User, related_name='conversations_as_b', on_delete=models.CASCADE)
+    last_message = models.ForeignKey(Message, related_name='+', null=True, blank=True, on_delete=models.SET_NULL)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # 各自未读的消息数
+    unread_a = models.IntegerField(default=0)
+    unread_b = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user_a', 'user_b')
+        indexes = [
+            models.Index(fields=['user_a', '-last_message_at'], name='conv_user_a_last_idx'),
+            models.Index(fields=['user_b', '-last_message_at'], name='conv_user_b_last_idx'),
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.user_a_id} <-> {self.user_b_id}"
+
+    @staticmethod
+    def pair(user_id, other_id):
+        return (user_id, other_id) if user_id <= other_id else (other_id, user_id)
+
+    @classmethod
+    def inbox(cls, user):
+        """user 的会话列表（有过消息的），按最后一条消息时间倒序，可直接交给 Paginator。"""
+        return ConversationInbox(user)
+
+    @classmethod
+    def record_message(cls, msg):
+        """新消息写入后更新会话：收件方未读数 +1，最后一条消息指针前移。"""
+        if msg.sender_id == msg.recipient_id:
+            return
+        a, b = cls.pair(msg.sender_id, msg.recipient_id)
+        conv, _ = cls.objects.get_or_create(user_a_id=a, user_b_id=b)
+        unread_field = 'unread_a' if msg.recipient_id == a else 'unread_b'
+        cls.objects.filter(pk=conv.pk).update(**{unread_field: F(unread_field) + 1})
+        # 并发写入时只允许指针向更新的消息移动
+        cls.objects.filter(pk=conv.pk).filter(
+            Q(last_message_at__isnull=True) | Q(last_message_at__lte=msg.created_at)
+        ).update(last_message=msg, last_message_at=msg.created_at)
+
+    @classmethod
+    def mark_read(cls, user, other):
+        """user 读完与 other 的对话后清零其未读数。"""
+        a, b = cls.pair(user.id, other.id)
+        unread_field = 'unread_a' if user.id == a else 'unread_b'
+        cls.objects.filter(user_a_id=a, user_b_id=b).update(**{unread_field: 0})
+
+    def other_user(self, user):
+        return self.user_b if user.id == self.user_a_id else self.user_a
+
+    def unread_for(self, user):
+        return self.unread_a if user.id == self.user_a_id else self.unread_b
+
+
+class ConversationInbox:
+    """某用户的会话列表，实现 Paginator 需要的 count() 与切片。
+
+    用户可能在会话的任一侧，Q(user_a) | Q(user_b) 再按时间排序会退化为 OR 条件加文件排序。
+    这里两侧各走一条 (user_x, -last_message_at) 索引查询，各取前 stop 行按时间归并（即两条有序
+    查询的 UNION），再按 id 一次取出本页会话。
+    """
+
+    def __init__(self, user):
+        base = Conversation.objects.filter(last_message_at__isnull=False)
+        self._sides = [base.filter(user_a=user), base.filter(user_b=user)]
+
+    def count(self):
+        return sum(qs.count() for qs in self._sides)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        keys = []
+        for qs in self._sides:
+            keys.extend(qs.order_by('-last_message_at').values_list('last_message_at', 'pk')[:stop])
+        keys.sort(reverse=True)
+        ids = [pk for _, pk in keys[start:stop]]
+        convs = Conversation.objects.select_related('user_a', 'user_b', 'last_message').in_bulk(ids)
+        return [convs[pk] for pk in ids]
@@ -0,0 +1,199 @@
+"""通知分发。
+
+视图调用 notify() 只登记一条轻量的 NotificationEvent，不在请求内写 Notification；
+由 process_notifications 命令批量消费队列：
+- 同一批中 (接收者, 触发者, 动作, 目标) 相同的事件合并为一条（如反复点赞/取消点赞）；
+- 接收者已有相同的未读通知时不再重复生成；
+- 其余事件一次 bulk_create 写入 Notification，并删除已处理的事件。
+
+聚合模式（NOTIFICATION_AGGREGATE_WINDOW > 0）下，同一 (接收者, 动作, 目标) 在窗口内
+只保留一行：新的触发者计入 actor_count 并记入最近触发者样本，该行原地更新为未读并移到最前，
+页面显示为 "X 等 N 人点赞了你的文章"。窗口从该行最近一次更新起算。
+actor_count 只按最近触发者样本去重，样本之外的人再次触发会被重复计入，是近似值。
+
+ContentType 通过 get_for_model 解析，命中进程内缓存后不再查询。
+settings.NOTIFICATION_DISPATCH = 'sync' 时跳过队列、在请求内直接写入，便于没有常驻 worker 的本地调试。
+"""
+from collections import Counter
+from datetime import timedelta
+from functools import reduce
+import operator
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Notification, NotificationEvent
+from .unread import invalidate_unread
+
+EVENT_BATCH_SIZE = 500
+# 聚合通知保留的最近触发者人数
+RECENT_ACTORS_SAMPLE = 3
+
+
+def _dispatch_mode() -> str:
+    return getattr(settings, 'NOTIFICATION_DISPATCH', 'queue')
+
+
+def _aggregate_window() -> int:
+    return getattr(settings, 'NOTIFICATION_AGGREGATE_WINDOW', 24 * 3600)
+
+
+def notify(user_id, actor_id, verb, target=None):
+    """登记一条发给 user_id 的通知；接收者与触发者相同时忽略。"""
+    if user_id == actor_id:
+        return
+    event = NotificationEvent(user_id=user_id, actor_id=actor_id, verb=verb)
+    if target is not None:
+        event.target_content_type_id = ContentType.objects.get_for_model(target).id
+        event.target_object_id = str(target.pk)
+    if _dispatch_mode() == 'sync':
+        write_notifications([event])
+    else:
+        event.save()
+
+
+def _event_key(e):
+    return (e.user_id, e.actor_id, e.verb, e.target_content_type_id, e.target_object_id)
+
+
+def write_notifications(events) -> int:
+    """把一批事件合并去重后写入 Notification，返回新建的通知数。
+
+    提交后让有新未读通知的接收者的缓存计数失效。
+    """
+    with transaction.atomic():
+        if _aggregate_window() > 0:
+            created, newly_unread = _write_aggregated(events)
+        else:
+            created, newly_unread = _write_individual(events)
+        transaction.on_commit(lambda: [invalidate_unread(uid, notifications=True) for uid in newly_unread])
+    return created
+
+
+def _write_individual(events):
+    unique = {}
+    for e in events:
+        unique[_event_key(e)] = e
+    if not unique:
+        return 0, Counter()
+
+    existing = set(
+        Notification.objects.filter(
+            unread=True,
+            user_id__in={k[0] for k in unique},
+            actor_id__in={k[1] for k in unique if k[1] is not None},
+            verb__in={k[2] for k in unique},
+        ).values_list('user_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id')
+    )
+    notifications = [
+        Notification(user_id=e.user_id, actor_id=e.actor_id, verb=e.verb,
+                     target_content_type_id=e.target_content_type_id, target_object_id=e.target_object_id,
+                     recent_actors=[e.actor_id])
+        for key, e in unique.items() if key not in existing
+    ]
+    Notification.objects.bulk_create(notifications, batch_size=EVENT_BATCH_SIZE)
+    return len(notifications), Counter(n.user_id for n in notifications)
+
+
+def _target_key(n):
+    return (n.user_id, n.verb, n.target_content_type_id, n.target_object_id)
+
+
+def _write_aggregated(events):
+    # 按 (接收者, 动作, 目标) 分组，组内触发者去重，越晚触发越靠后
+    groups = {}
+    for e in events:
+        actors = groups.setdefault(_target_key(e), [])
+        if e.actor_id in actors:
+            actors.remove(e.actor_id)
+        actors.append(e.actor_id)
+    if not groups:
+        return 0, Counter()
+
+    now = timezone.now()
+    since = now - timedelta(seconds=_aggregate_window())
+    existing = {}
+    # 只锁定并取出本批涉及的 (接收者, 动作, 目标) 行，而不是接收者窗口内的全部通知
+    same_target = reduce(operator.or_, (
+        Q(user_id=user_id, verb=verb, target_content_type_id=ct_id, target_object_id=obj_id)
+        for user_id, verb, ct_id, obj_id in groups
+    ))
+    rows = Notification.objects.select_for_update().filter(same_target, created_at__gte=since).order_by('created_at')
+    for n in rows:
+        existing[_target_key(n)] = n
+
+    to_create, to_update = [], []
+    newly_unread = Counter()
+    for key, actors in groups.items():
+        latest_first = actors[::-1]
+        n = existing.get(key)
+        if n is None:
+            to_create.append(Notification(
+                user_id=key[0], verb=key[1], target_content_type_id=key[2], target_object_id=key[3],
+                actor_id=actors[-1], actor_count=len(actors), recent_actors=latest_first[:RECENT_ACTORS_SAMPLE],
+            ))
+            newly_unread[key[0]] += 1
+            continue
+        sample = n.recent_actors or [n.actor_id]
+        new_actors = [a for a in actors if a not in sample]
+        if not new_actors and n.unread:
+            # 同一批人重复触发（如反复点赞/取消），不再提醒
+            continue
+        if not n.unread:
+            newly_unread[key[0]] += 1
+        n.actor_id = actors[-1]
+        n.actor_count += len(new_actors)
+        n.recent_actors = (latest_first + [a for a in sample if a not in actors])[:RECENT_ACTORS_SAMPLE]
+        n.unread = True
+        n.created_at = now
+        to_update.append(n)
+
+    Notification.objects.bulk_update(to_update, ['actor', 'actor_count', 'recent_actors', 'unread', 'created_at'],
+                                     batch_size=EVENT_BATCH_SIZE)
+    Notification.objects.bulk_create(to_create, batch_size=EVENT_BATCH_SIZE)
+    return len(to_create), newly_unread
+
+
+def process_events(batch_size=EVENT_BATCH_SIZE):
+    """消费一批队列中的事件，返回 (处理的事件数, 新建的通知数)。多个 worker 并行时互不重复。"""
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        events = list(
+            NotificationEvent.objects.select_for_update(skip_locked=skip_locked).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0, 0
+        created = write_notifications(events)
+        NotificationEvent.objects.filter(id__in=[e.id for e in events]).delete()
+    return len(events), created
+
+
+# 通知列表需要渲染的目标类型及其查询方式，其余类型（私信、用户）模板只用到 actor，不加载
+_TARGET_QUERIES = {
+    ('posting', 'post'): lambda qs: qs.only('id', 'title'),
+    ('posting', 'comment'): lambda qs: qs.select_related('post').only('id', 'post__id', 'post__title'),
+}
+
+
+def load_targets(notifications):
+    """批量加载一页通知的目标对象：每种类型一次查询，结果挂在 n.target_obj 上（已删除的为 None）。"""
+    ids_by_ct = {}
+    for n in notifications:
+        n.target_obj = None
+        if n.target_content_type_id and n.target_object_id:
+            ids_by_ct.setdefault(n.target_content_type_id, set()).add(n.target_object_id)
+
+    loaded = {}
+    for ct_id, ids in ids_by_ct.items():
+        ct = ContentType.objects.get_for_id(ct_id)
+        query = _TARGET_QUERIES.get((ct.app_label, ct.model))
+        model = ct.model_class()
+        if query is None or model is None:
+            continue
+        for obj in query(model._base_manager.filter(pk__in=ids)):
+            loaded[(ct_id, str(obj.pk))] = obj
+
+    for n in notifications:
+        n.target_obj = loaded.get((n.target_content_type_id, n.target_object_id))
+    return notifications
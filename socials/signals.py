@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from users.counters import bump_user_counters
+from posting.stats import invalidate_author_stats
+from .models import Follow
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        bump_user_counters(instance.follower_id, following_count=1)
+        bump_user_counters(instance.followed_id, followers_count=1)
+        invalidate_author_stats(instance.followed_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    bump_user_counters(instance.follower_id, following_count=-1)
+    bump_user_counters(instance.followed_id, followers_count=-1)
+    invalidate_author_stats(instance.followed_id)
@@ -1,3 +1,111 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from posting.models import Post, Comment
+from users.models import User
+from .models import Conversation, Message, Notification, NotificationEvent
+from .notifications import load_targets, process_events, write_notifications
+from .unread import get_unread_counts
 
-# Create your tests here.
+
+class UnreadCountsTests(TestCase):
+    """未读计数以数据库为准，通知 worker 写入后页面进程读到的计数随之变化。"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.bob = User.objects.create(username='bob', email='bob@example.com')
+
+    def test_worker_notifications_invalidate_counter(self):
+        self.assertEqual(get_unread_counts(self.alice.id)['notifications'], 0)
+        NotificationEvent.objects.create(user=self.alice, actor=self.bob, verb='关注了你')
+        with self.captureOnCommitCallbacks(execute=True):
+            process_events()
+        self.assertEqual(get_unread_counts(self.alice.id)['notifications'], 1)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_not_trusted(self):
+        self.assertEqual(get_unread_counts(self.alice.id)['notifications'], 0)
+        # 另一个进程写入的通知：本进程的本地缓存收不到任何变更
+        Notification.objects.create(user=self.alice, actor=self.bob, verb='关注了你')
+        self.assertEqual(get_unread_counts(self.alice.id)['notifications'], 1)
+
+
+class InboxTests(TestCase):
+    """会话列表合并用户在 user_a、user_b 两侧的会话，按最后一条消息时间倒序分页。"""
+
+    def test_inbox_merges_both_sides(self):
+        users = [User.objects.create(username=f'u{i}', email=f'u{i}@example.com') for i in range(5)]
+        me = users[2]
+        # 依次与其他用户通信，me 在一半会话中是 user_a、另一半是 user_b
+        for other in (users[0], users[3], users[1], users[4]):
+            Conversation.record_message(Message.objects.create(sender=other, recipient=me, content='hi'))
+        Conversation.record_message(Message.objects.create(sender=me, recipient=users[0], content='hi'))
+
+        paginator = Paginator(Conversation.inbox(me), 3)
+        self.assertEqual(paginator.count, 4)
+        pages = [[c.other_user(me).username for c in paginator.page(n)] for n in paginator.page_range]
+        self.assertEqual(pages, [['u0', 'u4', 'u1'], ['u3']])
+
+
+class AggregatedNotificationTests(TestCase):
+    """聚合窗口内同一 (接收者, 动作, 目标) 只保留一行，不同目标互不影响。"""
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.bob = User.objects.create(username='bob', email='bob@example.com')
+        self.carol = User.objects.create(username='carol', email='carol@example.com')
+
+    def event(self, actor, target):
+        event = NotificationEvent(user=self.alice, actor=actor, verb='点赞了你的文章')
+        event.target_content_type_id = ContentType.objects.get_for_model(User).id
+        event.target_object_id = str(target.pk)
+        return event
+
+    def test_aggregates_per_target_with_default_window(self):
+        with self.settings():
+            # 未配置时默认与 settings.py 一致，按 24 小时聚合
+            del settings.NOTIFICATION_AGGREGATE_WINDOW
+            write_notifications([self.event(self.bob, self.bob)])
+            write_notifications([self.event(self.bob, self.carol)])
+            write_notifications([self.event(self.carol, self.bob)])
+        rows = {n.target_object_id: n for n in Notification.objects.filter(user=self.alice)}
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[str(self.bob.pk)].actor_count, 2)
+        self.assertEqual(rows[str(self.carol.pk)].actor_count, 1)
+
+
+class LoadTargetsTests(TestCase):
+    """通知列表的目标对象按类型批量加载，每种类型一次查询，已删除或不需渲染的目标为 None。"""
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.bob = User.objects.create(username='bob', email='bob@example.com')
+
+    def notify(self, target):
+        return Notification.objects.create(
+            user=self.alice, actor=self.bob, verb='动态',
+            target_content_type=ContentType.objects.get_for_model(target), target_object_id=str(target.pk),
+        )
+
+    def test_one_query_per_content_type(self):
+        posts = [Post.objects.create(title=f'文章{i}', content_raw='正文', content='<p>正文</p>', author=self.alice)
+                 for i in range(3)]
+        comments = [Comment.objects.create(post=p, author=self.bob, content='评论') for p in posts[:2]]
+        for target in posts + comments + [self.bob]:
+            self.notify(target)
+        posts[2].delete()
+        notifications = list(Notification.objects.filter(user=self.alice).order_by('id'))
+
+        # 文章、评论各一次
+        with self.assertNumQueries(2):
+            load_targets(notifications)
+            titles = [n.target_obj.post.title for n in notifications[3:5]]
+        self.assertEqual(titles, ['文章0', '文章1'])
+        by_id = {n.id: n.target_obj for n in notifications}
+        self.assertEqual([by_id[n.id] for n in notifications[:2]], posts[:2])
+        # 文章已删除、用户类型不加载
+        self.assertIsNone(by_id[notifications[2].id])
+        self.assertIsNone(by_id[notifications[5].id])
@@ -0,0 +1,66 @@
+"""每个用户的未读计数（通知、私信），保存在共享缓存中。
+
+- 读取：缓存未命中时 COUNT 一次并写回；
+- 新通知/新私信、标记已读：删除缓存项，下次读取时从数据库重新计算。
+
+不在缓存中原地加减：通知由 process_notifications 进程写入，若缓存不在进程间共享，
+加减只会改到该进程自己的副本，页面进程读到的计数永远不变。删除后重算则无论写入发生在
+哪个进程，数据库都是唯一的依据；缓存不共享时（LocMemCache）干脆不缓存，每次直接 COUNT。
+
+合并接口 unread_counts 与 SSE 推送流 unread_stream 都从这里读取，不再每次 COUNT。
+"""
+from django.conf import settings
+from django.core.cache import cache
+from utils.cache import cache_is_shared
+from .models import Notification, Message
+
+NOTIF_UNREAD_PREFIX = 'unread_notif_'
+MSG_UNREAD_PREFIX = 'unread_msg_'
+
+
+def _timeout() -> int:
+    return getattr(settings, 'UNREAD_COUNTER_CACHE_TIMEOUT', 300)
+
+
+def _cache_set(key, value):
+    try:
+        cache.set(key, value, timeout=_timeout())
+    except Exception:
+        pass
+
+
+def get_unread_counts(user_id) -> dict:
+    """返回 {'notifications': 未读通知数, 'messages': 未读私信数}。"""
+    shared = cache_is_shared()
+    notif_key, msg_key = f'{NOTIF_UNREAD_PREFIX}{user_id}', f'{MSG_UNREAD_PREFIX}{user_id}'
+    try:
+        found = cache.get_many([notif_key, msg_key]) if shared else {}
+    except Exception:
+        found = {}
+
+    notifications = found.get(notif_key)
+    if notifications is None:
+        notifications = Notification.objects.filter(user_id=user_id, unread=True).count()
+        if shared:
+            _cache_set(notif_key, notifications)
+    messages = found.get(msg_key)
+    if messages is None:
+        messages = Message.objects.filter(recipient_id=user_id, is_read=False).count()
+        if shared:
+            _cache_set(msg_key, messages)
+    return {'notifications': notifications, 'messages': messages}
+
+
+def invalidate_unread(user_id, notifications=False, messages=False):
+    """未读数据有变化（新增或已读）时调用，删除对应的缓存计数。"""
+    keys = []
+    if notifications:
+        keys.append(f'{NOTIF_UNREAD_PREFIX}{user_id}')
+    if messages:
+        keys.append(f'{MSG_UNREAD_PREFIX}{user_id}')
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        pass
@@ -8,6 +8,8 @@ urlpatterns = [
     path('notifications/', views.notifications_list, name='notifications_list'),
     path('notifications/count/', views.notifications_count, name='notifications_count'),
     path('messages/count/', views.messages_count, name='messages_count'),
+    path('unread/', views.unread_counts, name='unread_counts'),
+    path('unread/stream/', views.unread_stream, name='unread_stream'),
     path('notifications/mark_read/', views.mark_notification_read, name='notifications_mark_read'),
     path('messages/', views.messages_list, name='messages_list'),
     path('messages/send/<str:username>/', views.send_message, name='send_message'),
@@ -2,12 +2,15 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.http import JsonResponse, HttpResponseForbidden
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
+from utils.cache import cache_is_shared
+from utils.pagination import paginate_by_cursor
 from users.views import get_current_user
-from .models import Follow, Notification, Message
+from .models import Follow, Notification, Message, Conversation
+from .notifications import notify, load_targets
+from .unread import get_unread_counts, invalidate_unread
 from users.models import User
 from django.urls import reverse
 from django.db.models import Q
-from django.contrib.contenttypes.models import ContentType
 
 
 @require_POST
@@ -26,23 +29,25 @@ def toggle_follow(request, username):
     else:
         following = True
         # 创建通知，不需要 target 因为 actor 已经指向被关注的用户
-        Notification.objects.create(user=target, actor=user, verb=f"关注了你")
-    followers_count = Follow.objects.filter(followed=target).count()
-    return JsonResponse({'ok': True, 'following': following, 'followers_count': followers_count})
+        notify(target.id, user.id, "关注了你")
+    # followers_count 由信号随关注/取消原子更新
+    target.refresh_from_db(fields=['followers_count'])
+    return JsonResponse({'ok': True, 'following': following, 'followers_count': target.followers_count})
 
 
 def notifications_list(request):
     user = get_current_user(request)
     if not user:
         return redirect('users:login')
-    qs = Notification.objects.filter(user=user).order_by('-created_at')
-    # Mark all unread notifications as read when user views the list
-    Notification.objects.filter(user=user, unread=True).update(unread=False)
+    qs = Notification.objects.filter(user=user).select_related('actor', 'target_content_type').order_by('-created_at')
+    
+    # Cursor pagination: 10 per page; targets are loaded in one query per content type
+    page_obj = paginate_by_cursor(qs, before=request.GET.get('before'), after=request.GET.get('after'), per_page=10)
+    load_targets(page_obj.object_list)
     
-    # Pagination: 10 per page
-    page_number = request.GET.get('page', 1)
-    paginator = Paginator(qs, 10)
-    page_obj = paginator.get_page(page_number)
+    # Mark all unread notifications as read when user views the list (after loading, so this page still shows them as unread)
+    Notification.objects.filter(user=user, unread=True).update(unread=False)
+    invalidate_unread(user.id, notifications=True)
     
     return render(request, 'notifications_list.html', {
         'notifications': page_obj,
@@ -58,11 +63,12 @@ def mark_notification_read(request, nid=None):
         return JsonResponse({'ok': False, 'error': '请先登录'}, status=401)
     if nid:
         n = get_object_or_404(Notification, id=nid, user=user)
-        n.unread = False
-        n.save(update_fields=['unread'])
+        if Notification.objects.filter(pk=n.pk, unread=True).update(unread=False):
+            invalidate_unread(user.id, notifications=True)
         return JsonResponse({'ok': True})
     else:
         Notification.objects.filter(user=user, unread=True).update(unread=False)
+        invalidate_unread(user.id, notifications=True)
         return JsonResponse({'ok': True})
 
 
@@ -70,8 +76,7 @@ def notifications_count(request):
     user = get_current_user(request)
     if not user:
         return JsonResponse({'ok': True, 'count': 0})
-    c = Notification.objects.filter(user=user, unread=True).count()
-    return JsonResponse({'ok': True, 'count': c})
+    return JsonResponse({'ok': True, 'count': get_unread_counts(user.id)['notifications']})
 
 
 def messages_count(request):
@@ -79,8 +84,63 @@ def messages_count(request):
     if not user:
         return JsonResponse({'ok': True, 'count': 0})
     # 未读私信数（收件箱中未读）
-    c = Message.objects.filter(recipient=user, is_read=False).count()
-    return JsonResponse({'ok': True, 'count': c})
+    return JsonResponse({'ok': True, 'count': get_unread_counts(user.id)['messages']})
+
+
+def unread_counts(request):
+    """合并的未读计数接口：{'notifications': n, 'messages': m}，读自缓存的计数器。"""
+    user = get_current_user(request)
+    if not user:
+        return JsonResponse({'ok': True, 'notifications': 0, 'messages': 0})
+    return JsonResponse({'ok': True, **get_unread_counts(user.id)})
+
+
+async def unread_stream(request):
+    """未读计数的 Server-Sent Events 推送流，需以 ASGI（RmsnBlog.asgi）部署。
+
+    服务端按 UNREAD_STREAM_POLL_INTERVAL 读取缓存中的计数，变化时推送一条事件，
+    空闲时定期发送注释行保活；连接在 UNREAD_STREAM_MAX_SECONDS 后关闭，由浏览器的
+    EventSource 自动重连。没有 Redis / Memcached 时每次读取都是两次 COUNT，
+    间隔放宽到与页面轮询相同的 30 秒，不比轮询增加负载。
+    """
+    import asyncio
+    import json
+    import time
+    from asgiref.sync import sync_to_async
+    from django.conf import settings
+    from django.http import StreamingHttpResponse
+
+    user = await sync_to_async(get_current_user)(request)
+    if not user:
+        return JsonResponse({'ok': False, 'error': '请先登录'}, status=401)
+
+    poll = getattr(settings, 'UNREAD_STREAM_POLL_INTERVAL', 10)
+    if not cache_is_shared():
+        poll = max(poll, 30)
+    max_seconds = getattr(settings, 'UNREAD_STREAM_MAX_SECONDS', 300)
+    # 不占用共享的主线程：各连接的读取互不排队
+    load_counts = sync_to_async(get_unread_counts, thread_sensitive=False)
+
+    async def events():
+        started = last_sent = time.monotonic()
+        last = None
+        # 断线重连的间隔（毫秒）
+        yield f'retry: {int(poll * 1000)}\n\n'
+        while time.monotonic() - started < max_seconds:
+            counts = await load_counts(user.id)
+            now = time.monotonic()
+            if counts != last:
+                last, last_sent = counts, now
+                yield f'data: {json.dumps(counts)}\n\n'
+            elif now - last_sent >= 15:
+                last_sent = now
+                yield ': keepalive\n\n'
+            await asyncio.sleep(poll)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 def messages_list(request):
@@ -95,14 +155,15 @@ def messages_list(request):
             other_user = User.objects.get(username=chat_with)
             # 标记来自对方的未读消息为已读
             Message.objects.filter(sender=other_user, recipient=user, is_read=False).update(is_read=True)
+            Conversation.mark_read(user, other_user)
+            invalidate_unread(user.id, messages=True)
             # 获取双方的所有消息
             qs = Message.objects.filter(
                 Q(sender=user, recipient=other_user) | Q(sender=other_user, recipient=user)
-            ).order_by('created_at')
-            # 分页
-            page_number = request.GET.get('page', 1)
-            paginator = Paginator(qs, 50)
-            page_obj = paginator.get_page(page_number)
+            ).select_related('sender')
+            # 游标分页：默认显示最近的 50 条（旧到新排列），可向前加载更早的消息
+            page_obj = paginate_by_cursor(qs, before=request.GET.get('before'), after=request.GET.get('after'),
+                                          per_page=50, display='asc')
             return render(request, 'messages_chat.html', {
                 'messages': page_obj,
                 'page_obj': page_obj,
@@ -112,34 +173,16 @@ def messages_list(request):
         except User.DoesNotExist:
             pass
     
-    # 获取所有对话列表（按最后一条消息时间排序）
-    # 获取所有相关用户
-    user_ids = set()
-    msgs = Message.objects.filter(Q(sender=user) | Q(recipient=user)).values('sender_id', 'recipient_id')
-    for m in msgs:
-        user_ids.add(m['sender_id'])
-        user_ids.add(m['recipient_id'])
-    user_ids.discard(user.id)
-    
-    # 为每个对话伙伴获取最后一条消息
-    conversations = []
-    for uid in user_ids:
-        other = User.objects.get(id=uid)
-        last_msg = Message.objects.filter(
-            Q(sender=user, recipient=other) | Q(sender=other, recipient=user)
-        ).order_by('-created_at').first()
-        if last_msg:
-            unread_count = Message.objects.filter(sender=other, recipient=user, is_read=False).count()
-            conversations.append({
-                'other_user': other,
-                'last_message': last_msg,
-                'unread_count': unread_count,
-            })
+    # 获取所有对话列表（按最后一条消息时间排序），会话表已维护最后一条消息与未读数
+    paginator = Paginator(Conversation.inbox(user), 20)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    conversations = [{
+        'other_user': conv.other_user(user),
+        'last_message': conv.last_message,
+        'unread_count': conv.unread_for(user),
+    } for conv in page_obj]
     
-    # 按最后消息时间排序
-    conversations.sort(key=lambda x: x['last_message'].created_at, reverse=True)
-    
-    return render(request, 'messages_list.html', {'conversations': conversations, 'user': user})
+    return render(request, 'messages_list.html', {'conversations': conversations, 'page_obj': page_obj, 'user': user})
 
 
 @require_POST
@@ -162,13 +205,11 @@ def send_message(request, username):
         return JsonResponse({'ok': False, 'error': '消息内容不能为空'}, status=400)
     
     msg = Message.objects.create(sender=user, recipient=recipient, content=content)
+    Conversation.record_message(msg)
+    invalidate_unread(recipient.id, messages=True)
     
-    # 创建通知给收件人
-    try:
-        ct = ContentType.objects.get_for_model(msg.__class__)
-        Notification.objects.create(user=recipient, actor=user, verb='向你发送了私信', target_content_type=ct, target_object_id=str(msg.id))
-    except Exception:
-        Notification.objects.create(user=recipient, actor=user, verb='向你发送了私信')
+    # 创建通知给收件人（交给通知队列异步写入）
+    notify(recipient.id, user.id, '向你发送了私信', target=msg)
     
     return JsonResponse({
         'ok': True,
@@ -0,0 +1,42 @@
+// 未读通知/私信计数：启用推送（ASGI 部署）时通过 SSE 接收更新，否则轮询合并接口。
+// 用法：<script src="unread.js" data-counts-url="..." data-stream-url="..." data-stream="1"></script>
+(function(){
+    var script = document.currentScript;
+    if (!script) return;
+    var countsUrl = script.dataset.countsUrl;
+    var streamUrl = script.dataset.streamUrl;
+
+    function setBadge(id, count){
+        var el = document.getElementById(id);
+        if (el) {
+            el.textContent = count;
+            el.style.display = count ? 'inline-block' : 'none';
+        }
+    }
+
+    function apply(d){
+        if (!d || d.notifications === undefined) return;
+        setBadge('notif-count', d.notifications);
+        setBadge('msg-count', d.messages);
+        document.dispatchEvent(new CustomEvent('unread-counts', { detail: d }));
+    }
+
+    function refresh(){
+        return fetch(countsUrl, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+            .then(function(r){ return r.json(); })
+            .then(apply)
+            .catch(function(err){ console.error('Failed to refresh unread counts', err); });
+    }
+    window.refreshUnreadCounts = refresh;
+
+    if (script.dataset.stream === '1' && streamUrl && window.EventSource) {
+        // 连接断开后 EventSource 会按服务端给出的 retry 间隔自动重连
+        var source = new EventSource(streamUrl);
+        source.onmessage = function(e){
+            try { apply(JSON.parse(e.data)); } catch (err) {}
+        };
+    } else {
+        refresh();
+        setInterval(refresh, 30000);
+    }
+})();
@@ -0,0 +1,10 @@
+from django.db.models import F
+from .models import User
+from .sessions import invalidate_user
+
+
+def bump_user_counters(user_id, **deltas):
+    """原子地增减用户的冗余计数，例如 bump_user_counters(uid, followers_count=1)。"""
+    User.objects.filter(pk=user_id).update(**{field: F(field) + delta for field, delta in deltas.items()})
+    # update() 不触发 post_save，需要手动清除会话缓存里的用户对象
+    invalidate_user(user_id)
@@ -0,0 +1,13 @@
+from .sessions import resolve_session_user
+
+
+class SessionUserMiddleware:
+    """每个请求只解析一次 session_token，结果挂在 request.current_user 上，
+    供 get_current_user 直接读取。"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.current_user = resolve_session_user(request.COOKIES.get('session_token'))
+        return self.get_response(request)
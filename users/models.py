@@ -6,6 +6,9 @@ from datetime import timedelta
 import hashlib
 import uuid
 
+# 会话有效期（cookie 的 max_age 与之保持一致）
+SESSION_LIFETIME = timedelta(days=7)
+
 class User(models.Model):
     THEME_CHOICES = [
         ('light', '日间模式'),
@@ -22,6 +25,10 @@ class User(models.Model):
     avatar = models.ImageField(upload_to=avatar_upload_path, null=True, blank=True)
     bg = models.ImageField(upload_to=bg_upload_path, null=True, blank=True)
     theme = models.CharField(max_length=10, choices=THEME_CHOICES, default='auto')
+    # 冗余计数，随关注/发文原子更新，可用 reconcile_counters 命令重算
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+    posts_count = models.IntegerField(default=0)
 
     def __str__(self):
         return self.username
@@ -69,8 +76,24 @@ class UserSession(models.Model):
         session.save()
         return token
     
+    @property
+    def expires_at(self):
+        return self.created_at + SESSION_LIFETIME
+
     def is_valid(self) -> bool:
-        return self.is_active and (self.created_at + timedelta(days=7) > timezone.now())
+        return self.is_active and (self.expires_at > timezone.now())
+
+
+class SessionRevocation(models.Model):
+    """签名会话的吊销记录（可选持久化，缓存丢失时兜底）"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # 为空表示吊销该用户在 created_at 之前签发的全部 token
+    jti = models.CharField(max_length=32, blank=True, db_index=True)
+    # 写入吊销记录时按时间清理过期的记录
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.jti or '*'}"
 
 
 class PasswordResetToken(models.Model):
@@ -0,0 +1,244 @@
+"""登录会话解析与缓存。
+
+支持两种会话模式（settings.SESSION_TOKEN_MODE）：
+- 'db'：token 对应 UserSession 表中的一行；
+- 'signed'：token 为 HMAC 签名的 {用户 id, token id, 签发时间}，校验只在内存中完成，
+  注销/重置密码通过缓存中的吊销集合生效。吊销集合与用户对象都要从共享缓存读取才能省掉数据库往返，
+  因此签名模式只在 Redis / Memcached 上生效，其他缓存后端下仍签发数据库会话
+  （已签发的签名 token 照常校验，吊销记录回查数据库）。
+
+缓存分两层：
+- session_token -> {user_id, expires_at}：命中时无需查询 UserSession；
+- user_id -> User：命中时无需查询 User，用户资料保存时由信号失效。
+
+注销、重置密码以及会话过期时会主动清除对应的缓存项。这些失效要对所有进程生效，
+因此两层缓存只在 Redis / Memcached 上启用；本地内存缓存（单进程可见）与数据库缓存表
+（命中也要查询数据库）下不缓存，每次用一条 select_related 查询取出会话与用户。
+"""
+import time
+import uuid
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from utils.cache import cache_is_shared
+from .models import User, UserSession, SessionRevocation, SESSION_LIFETIME
+
+SESSION_CACHE_PREFIX = 'session_user_'
+USER_CACHE_PREFIX = 'user_obj_'
+REVOKED_JTI_PREFIX = 'session_revoked_'
+NOT_BEFORE_PREFIX = 'session_not_before_'
+SIGNED_SESSION_SALT = 'users.sessions.signed'
+
+
+def _cache_timeout() -> int:
+    return getattr(settings, 'SESSION_USER_CACHE_TIMEOUT', 300)
+
+
+def _cache_get(key):
+    if not cache_is_shared():
+        return None
+    try:
+        return cache.get(key)
+    except Exception:
+        return None
+
+
+def _cache_set(key, value, timeout):
+    if not cache_is_shared():
+        return
+    try:
+        cache.set(key, value, timeout=timeout)
+    except Exception:
+        pass
+
+
+def _cache_get_many(keys):
+    if not cache_is_shared():
+        return {}
+    try:
+        return cache.get_many(keys)
+    except Exception:
+        return {}
+
+
+def _cache_delete_many(keys):
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        pass
+
+
+def get_cached_user(user_id):
+    """按 id 获取用户，优先读缓存。"""
+    key = f'{USER_CACHE_PREFIX}{user_id}'
+    user = _cache_get(key)
+    if user is None:
+        user = User.objects.filter(id=user_id).first()
+        if user is not None:
+            _cache_set(key, user, _cache_timeout())
+    return user
+
+
+def invalidate_user(user_id):
+    """用户资料变化后清除缓存的 User 对象。"""
+    _cache_delete_many([f'{USER_CACHE_PREFIX}{user_id}'])
+
+
+def _signed_mode() -> bool:
+    return getattr(settings, 'SESSION_TOKEN_MODE', 'db') == 'signed' and cache_is_shared()
+
+
+def _revocation_db_enabled() -> bool:
+    # 缓存中的吊销记录可能被淘汰；本地内存缓存中的记录其他进程根本看不到，此时必须走数据库
+    return getattr(settings, 'SESSION_REVOCATION_DB', True) or not cache_is_shared()
+
+
+def _is_signed_token(session_token: str) -> bool:
+    # 数据库会话 token 为 uuid4().hex，不含分隔符 ':'
+    return ':' in session_token
+
+
+def create_session_token(user: User) -> str:
+    """为用户签发会话 token，按 SESSION_TOKEN_MODE 选择实现。"""
+    if _signed_mode():
+        payload = {'u': user.id, 'j': uuid.uuid4().hex[:16], 't': round(time.time(), 3)}
+        return signing.dumps(payload, salt=SIGNED_SESSION_SALT)
+    return UserSession.create_session(user)
+
+
+def _load_signed_token(session_token):
+    try:
+        return signing.loads(session_token, salt=SIGNED_SESSION_SALT,
+                             max_age=SESSION_LIFETIME.total_seconds())
+    except signing.BadSignature:
+        # SignatureExpired 是 BadSignature 的子类，超过 7 天同样视为无效
+        return None
+
+
+def _is_revoked(payload) -> bool:
+    """检查签名 token 是否已被吊销：单个 token（注销）或用户的全部旧 token（重置密码）。"""
+    jti_key = f'{REVOKED_JTI_PREFIX}{payload["j"]}'
+    nb_key = f'{NOT_BEFORE_PREFIX}{payload["u"]}'
+    found = _cache_get_many([jti_key, nb_key])
+
+    if _revocation_db_enabled() and (jti_key not in found or nb_key not in found):
+        # 缓存缺失时回查持久化的吊销记录，并把结论（包括"未吊销"）写回缓存
+        records = SessionRevocation.objects.filter(
+            Q(jti=payload['j']) | Q(jti=''), user_id=payload['u']
+        ).values_list('jti', 'created_at')
+        revoked = False
+        not_before = 0
+        for jti, created_at in records:
+            if jti:
+                revoked = True
+            else:
+                not_before = max(not_before, created_at.timestamp())
+        found.setdefault(jti_key, 1 if revoked else 0)
+        found.setdefault(nb_key, not_before)
+        _cache_set(jti_key, found[jti_key], _cache_timeout())
+        _cache_set(nb_key, found[nb_key], _cache_timeout())
+
+    if found.get(jti_key):
+        return True
+    return payload['t'] < (found.get(nb_key) or 0)
+
+
+def _resolve_signed_user(session_token):
+    payload = _load_signed_token(session_token)
+    if payload is None or _is_revoked(payload):
+        return None
+    return get_cached_user(payload['u'])
+
+
+def _prune_revocations():
+    # 超过会话有效期的 token 已不可能通过校验，对应的吊销记录无需保留；每次写入时顺带清理
+    SessionRevocation.objects.filter(created_at__lt=timezone.now() - SESSION_LIFETIME).delete()
+
+
+def _revoke_signed_tokens(session_tokens):
+    remaining = int(SESSION_LIFETIME.total_seconds())
+    records = []
+    for token in session_tokens:
+        payload = _load_signed_token(token)
+        if payload is None:
+            continue
+        _cache_set(f'{REVOKED_JTI_PREFIX}{payload["j"]}', 1, remaining)
+        records.append(SessionRevocation(user_id=payload['u'], jti=payload['j']))
+    if records and _revocation_db_enabled():
+        _prune_revocations()
+        SessionRevocation.objects.bulk_create(records)
+
+
+def _revoke_user_signed_tokens(user):
+    now = time.time()
+    _cache_set(f'{NOT_BEFORE_PREFIX}{user.id}', now, int(SESSION_LIFETIME.total_seconds()))
+    if _revocation_db_enabled():
+        _prune_revocations()
+        SessionRevocation.objects.create(user=user, jti='')
+
+
+def resolve_session_user(session_token):
+    """根据 session_token 解析当前用户；无效或过期时返回 None。"""
+    if not session_token:
+        return None
+
+    if _is_signed_token(session_token):
+        return _resolve_signed_user(session_token)
+
+    key = f'{SESSION_CACHE_PREFIX}{session_token}'
+    entry = _cache_get(key)
+    now = timezone.now()
+
+    if entry is None:
+        try:
+            session = UserSession.objects.select_related('user').get(
+                session_token=session_token,
+                is_active=True
+            )
+        except UserSession.DoesNotExist:
+            # 无效 token 也缓存一小段时间，避免伪造 cookie 反复打到数据库
+            _cache_set(key, {'user_id': None, 'expires_at': None}, 60)
+            return None
+
+        if not session.is_valid():
+            session.is_active = False
+            session.save()
+            return None
+
+        remaining = int((session.expires_at - now).total_seconds())
+        _cache_set(key, {'user_id': session.user_id, 'expires_at': session.expires_at.timestamp()},
+                   min(_cache_timeout(), remaining))
+        _cache_set(f'{USER_CACHE_PREFIX}{session.user_id}', session.user, _cache_timeout())
+        return session.user
+
+    if entry['user_id'] is None:
+        return None
+
+    if entry['expires_at'] <= now.timestamp():
+        # 会话已过期：同步标记数据库中的会话并清除缓存
+        end_sessions([session_token])
+        return None
+
+    return get_cached_user(entry['user_id'])
+
+
+def end_sessions(session_tokens):
+    """使给定的会话失效（数据库与缓存）。"""
+    session_tokens = [t for t in session_tokens if t]
+    _revoke_signed_tokens([t for t in session_tokens if _is_signed_token(t)])
+    session_tokens = [t for t in session_tokens if not _is_signed_token(t)]
+    if not session_tokens:
+        return
+    UserSession.objects.filter(session_token__in=session_tokens, is_active=True).update(is_active=False)
+    _cache_delete_many([f'{SESSION_CACHE_PREFIX}{t}' for t in session_tokens])
+
+
+def end_user_sessions(user):
+    """删除某用户的全部会话（用于重置密码后强制重新登录）。"""
+    tokens = list(UserSession.objects.filter(user=user).values_list('session_token', flat=True))
+    UserSession.objects.filter(user=user).delete()
+    _cache_delete_many([f'{SESSION_CACHE_PREFIX}{t}' for t in tokens])
+    _revoke_user_signed_tokens(user)
+    invalidate_user(user.id)
@@ -0,0 +1,138 @@
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from .models import User, UserSession, SessionRevocation, SESSION_LIFETIME
+from .sessions import resolve_session_user, create_session_token, end_sessions, end_user_sessions
+
+
+class StaleCachedUserSaveTests(TestCase):
+    """会话缓存中的 User 可能带有过期的冗余计数，资料/主题保存不能把它们写回数据库。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(username='alice', email='alice@example.com')
+        self.user.password_encrypt('pw123456')
+        self.user.save()
+        self.client.post(reverse('users:login'), {'username': 'alice', 'password': 'pw123456'})
+        # 访问一次页面，让缓存持有计数为 0 的用户对象
+        self.client.get(reverse('users:dashboard'))
+        # 模拟其他进程用 F() 原子更新计数
+        User.objects.filter(pk=self.user.pk).update(
+            followers_count=F('followers_count') + 3,
+            following_count=F('following_count') + 2,
+            posts_count=F('posts_count') + 1,
+        )
+
+    def assertCountersKept(self):
+        counts = User.objects.values_list('followers_count', 'following_count', 'posts_count').get(pk=self.user.pk)
+        self.assertEqual(counts, (3, 2, 1))
+
+    def test_set_theme_keeps_counters(self):
+        resp = self.client.post(reverse('users:set_theme'), json.dumps({'theme': 'dark'}),
+                                content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(User.objects.get(pk=self.user.pk).theme, 'dark')
+        self.assertCountersKept()
+
+    def test_profile_edit_keeps_counters(self):
+        resp = self.client.post(reverse('users:profile_edit'), {
+            'email': 'alice@example.com', 'bio': '新的简介', 'theme': 'light',
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(User.objects.get(pk=self.user.pk).bio, '新的简介')
+        self.assertCountersKept()
+
+
+
+class SessionInvalidationTests(TestCase):
+    """注销等会话失效必须对所有进程生效。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(username='bob', email='bob@example.com')
+        self.user.password_encrypt('pw123456')
+        self.user.save()
+
+    def _login(self):
+        self.client.post(reverse('users:login'), {'username': 'bob', 'password': 'pw123456'})
+        token = self.client.cookies['session_token'].value
+        self.assertEqual(resolve_session_user(token), self.user)
+        return token
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_not_trusted(self):
+        token = self._login()
+        # 另一个进程注销了该会话：数据库已更新，但它清除不到本进程的本地缓存
+        UserSession.objects.filter(session_token=token).update(is_active=False)
+        self.assertIsNone(resolve_session_user(token))
+
+    def test_logout_ends_session(self):
+        token = self._login()
+        end_sessions([token])
+        self.assertIsNone(resolve_session_user(token))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                           'LOCATION': 'django_cache'}})
+    def test_database_cache_is_not_used(self):
+        token = self._login()
+        # 不读写缓存表，只有一条 select_related 查询
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_session_user(token), self.user)
+
+
+@override_settings(SESSION_TOKEN_MODE='signed')
+class SignedTokenRevocationTests(TestCase):
+    """签名 token 的吊销不能只依赖可能被淘汰、或不在进程间共享的缓存。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(username='carol', email='carol@example.com')
+        self.user.password_encrypt('pw123456')
+        self.user.save()
+        # 签名模式只在 Redis / Memcached 上生效；测试中把本地缓存当作共享缓存
+        patcher = mock.patch('users.sessions.cache_is_shared', return_value=True)
+        self.shared = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_logout_survives_cache_eviction(self):
+        token = create_session_token(self.user)
+        self.assertEqual(resolve_session_user(token), self.user)
+        end_sessions([token])
+        # 缓存中的吊销记录被淘汰
+        cache.clear()
+        self.assertIsNone(resolve_session_user(token))
+
+    def test_password_reset_survives_cache_eviction(self):
+        token = create_session_token(self.user)
+        time.sleep(0.01)
+        end_user_sessions(self.user)
+        cache.clear()
+        self.assertIsNone(resolve_session_user(token))
+
+    @override_settings(SESSION_REVOCATION_DB=False)
+    def test_process_local_cache_fails_closed(self):
+        token = create_session_token(self.user)
+        # 换成本地缓存部署后，吊销只记在了处理注销的进程里
+        self.shared.return_value = False
+        end_sessions([token])
+        cache.clear()
+        self.assertIsNone(resolve_session_user(token))
+
+    def test_requires_shared_cache(self):
+        self.shared.return_value = False
+        token = create_session_token(self.user)
+        self.assertTrue(UserSession.objects.filter(session_token=token).exists())
+
+    def test_expired_revocations_are_pruned(self):
+        stale = SessionRevocation.objects.create(user=self.user, jti='old')
+        SessionRevocation.objects.filter(pk=stale.pk).update(
+            created_at=timezone.now() - SESSION_LIFETIME - timedelta(minutes=1))
+        end_sessions([create_session_token(self.user)])
+        self.assertFalse(SessionRevocation.objects.filter(pk=stale.pk).exists())
+        self.assertEqual(SessionRevocation.objects.count(), 1)
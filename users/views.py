@@ -1,5 +1,6 @@
 from django.shortcuts import render, redirect
-from .models import User, UserSession, PasswordResetToken
+from .models import User, PasswordResetToken
+from .sessions import resolve_session_user, create_session_token, end_sessions, end_user_sessions
 from django.http import JsonResponse, HttpResponse
 from .forms import RegistrationForm, LoginForm, ProfileEditForm, RequestPasswordResetForm, PasswordResetForm
 from utils.email import send_verification_email
@@ -15,25 +16,11 @@ _IP_RATE_MAP = {}
 
 
 def get_current_user(request):
-    """获取当前登录用户"""
-    session_token = request.COOKIES.get('session_token')
-    if not session_token:
-        return None
-    
-    try:
-        session = UserSession.objects.get(
-            session_token=session_token,
-            is_active=True
-        )
-        if session.is_valid():
-            return session.user
-        else:
-            session.is_active = False
-            session.save()
-    except UserSession.DoesNotExist:
-        pass
-    
-    return None
+    """获取当前登录用户（由 SessionUserMiddleware 在请求开始时解析）"""
+    if not hasattr(request, 'current_user'):
+        # 未启用中间件时按需解析一次，并在本次请求内复用
+        request.current_user = resolve_session_user(request.COOKIES.get('session_token'))
+    return request.current_user
 
 def require_login(view_func):
     """登陆装饰器"""
@@ -65,7 +52,7 @@ def login(request):
             try:
                 user = User.objects.get(username=username)
                 if user.verify_password(password):
-                    token = UserSession.create_session(user)
+                    token = create_session_token(user)
                     # 登录成功后跳转到 next 参数指定的页面，或默认首页
                     next_url = request.POST.get('next') or request.GET.get('next', 'index')
                     response = redirect(next_url)
@@ -104,7 +91,7 @@ def register(request):
                 user = User(username=username, email=email)
                 user.password_encrypt(password)
                 user.save()
-                token = UserSession.create_session(user)
+                token = create_session_token(user)
                 # 注册成功后跳转到 next 参数指定的页面，或默认首页
                 next_url = request.POST.get('next') or request.GET.get('next', 'index')
                 response = redirect(next_url)
@@ -124,30 +111,15 @@ def dashboard(request):
         return redirect('users:login')
     
     # 获取用户发布的文章统计
-    from posting.models import Post, Comment
-    from django.db.models import Sum
+    from posting.models import Post
+    from posting.stats import get_author_stats
     
     user_posts = Post.objects.filter(author=user).order_by('-created_at')[:5]
-    posts_count = Post.objects.filter(author=user).count()
-    # 计算该用户所有文章收到的评论总数
-    user_post_ids = Post.objects.filter(author=user).values_list('id', flat=True)
-    comments_count = Comment.objects.filter(post_id__in=user_post_ids).count()
-    # 计算该用户所有文章的浏览量总和（保留原有数据）
-    views_count = Post.objects.filter(author=user).aggregate(total=Sum('views_count'))['total'] or 0
-    # 计算粉丝数（被关注者数量）
-    try:
-        from socials.models import Follow
-        followers_count = Follow.objects.filter(followed=user).count()
-    except Exception:
-        followers_count = 0
 
     context = {
         'user': user,
         'user_posts': user_posts,
-        'posts_count': posts_count,
-        'comments_count': comments_count,
-        'views_count': views_count,
-        'followers_count': followers_count,
+        **get_author_stats(user),
     }
     return render(request, 'dashboard.html', context)
 
@@ -164,22 +136,9 @@ def profile(request, username=None):
             return redirect('users:login')
         profile_user = current_user
     
-    # 获取该用户的统计信息
-    from posting.models import Post, Comment
-    from django.db.models import Sum
-    
-    posts_count = Post.objects.filter(author=profile_user).count()
-    # 计算该用户所有文章收到的评论总数
-    user_post_ids = Post.objects.filter(author=profile_user).values_list('id', flat=True)
-    comments_count = Comment.objects.filter(post_id__in=user_post_ids).count()
-    # 计算该用户所有文章的浏览量总和（保留）
-    views_count = Post.objects.filter(author=profile_user).aggregate(total=Sum('views_count'))['total'] or 0
-    # 粉丝数
-    try:
-        from socials.models import Follow
-        followers_count = Follow.objects.filter(followed=profile_user).count()
-    except Exception:
-        followers_count = 0
+    # 获取该用户的统计信息（单条聚合查询，短时缓存）
+    from posting.stats import get_author_stats
+    stats = get_author_stats(profile_user)
     
     # 判断是否是当前用户自己的页面
     is_own_profile = current_user and current_user.id == profile_user.id
@@ -196,14 +155,16 @@ def profile(request, username=None):
         'user': profile_user,
         'current_user': current_user,
         'is_own_profile': is_own_profile,
-        'posts_count': posts_count,
-        'comments_count': comments_count,
-        'views_count': views_count,
-        'followers_count': followers_count,
+        **stats,
         'is_following': is_following,
     }
     return render(request, 'profile.html', context)
 
+def _save_profile(form):
+    # 只写表单中的字段：user 来自会话缓存，其中的关注/文章数可能已过期，整行保存会覆盖最新计数
+    user = form.save(commit=False)
+    user.save(update_fields=ProfileEditForm.Meta.fields)
+
 def profile_edit(request):
     user = get_current_user(request)
     if not user:
@@ -227,10 +188,10 @@ def profile_edit(request):
                 # 清空session中的验证码
                 request.session.pop('verification_code', None)
                 request.session.pop('verification_email', None)
-                form.save()
+                _save_profile(form)
                 return redirect('users:dashboard')
         elif form.is_valid():
-            form.save()
+            _save_profile(form)
             return redirect('users:dashboard')
     else:
         form = ProfileEditForm(instance=user)
@@ -246,13 +207,9 @@ def logout(request):
     session_token = request.COOKIES.get('session_token')
     response = redirect('index')
     if session_token:
-        try:
-            session = UserSession.objects.get(session_token=session_token, is_active=True)
-            session.is_active = False
-            session.save()
-        except UserSession.DoesNotExist:
-            pass
+        end_sessions([session_token])
         response.delete_cookie('session_token')
+    request.current_user = None
     return response
 
 
@@ -340,7 +297,7 @@ def set_theme(request):
         
         # 更新用户主题偏好
         user.theme = theme
-        user.save()
+        user.save(update_fields=['theme'])
         
         return JsonResponse({'ok': True, 'theme': theme})
     except json.JSONDecodeError:
@@ -426,10 +383,10 @@ def reset_password(request):
                     # 更新用户密码
                     user = User.objects.get(email=email)
                     user.password_encrypt(new_password)
-                    user.save()
+                    user.save(update_fields=['password', 'salt'])
                     
                     # 删除该用户的所有会话（强制重新登录）
-                    UserSession.objects.filter(user=user).delete()
+                    end_user_sessions(user)
                     
                     # 清除 session 中的邮箱
                     del request.session['password_reset_email']
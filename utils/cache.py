@@ -0,0 +1,17 @@
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# 不能当作共享内存缓存使用的后端
+_NOT_SHARED_BACKENDS = (LocMemCache, DatabaseCache, FileBasedCache)
+
+
+def cache_is_shared(alias='default') -> bool:
+    """缓存是否为进程间共享的内存缓存（Redis、Memcached）。
+
+    本地内存缓存（LocMemCache）只对当前进程可见，一个进程里的删除、吊销对其他进程无效；
+    数据库缓存表虽然共享，但每次命中都是一次数据库查询（写入还要 COUNT(*) 检查淘汰），incr 也不是原子的。
+    依赖缓存做失效通知或用缓存代替数据库查询的地方，在这些后端上应改为直接查数据库。
+    """
+    return not isinstance(caches[alias], _NOT_SHARED_BACKENDS)
@@ -0,0 +1,150 @@
+"""基于 (created_at, id) 的游标（keyset）分页。
+
+与 OFFSET 分页不同，翻页时不需要 COUNT(*)，也不需要扫描并丢弃前面的行：
+每一页都以上一页边界行的 (created_at, id) 为起点，借助索引直接定位。
+游标是对边界键的 URL 安全编码，对客户端不透明。
+
+- before=<游标>：加载比该位置更旧的一页（"加载更早"）；
+- after=<游标>：加载比该位置更新的一页（"加载更新"）；
+- 两者都不传时返回最新的一页。
+
+iter_keyset 用同样的方式顺序读取整个结果集，供流式输出、导出等需要遍历大量行的地方使用。
+"""
+import base64
+import binascii
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(created_at, pk) -> str:
+    raw = f'{created_at.isoformat()}|{pk}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, model):
+    """把游标还原为 (created_at, pk)；格式无效时返回 None。"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        ts, pk = raw.split('|', 1)
+        created_at = parse_datetime(ts)
+        pk = model._meta.pk.to_python(pk)
+    except (ValueError, TypeError, UnicodeError, binascii.Error, ValidationError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
+
+
+class CursorPage:
+    """一页结果。object_list 始终按 display 指定的顺序排列。"""
+
+    def __init__(self, object_list, has_older, has_newer, field):
+        self.object_list = object_list
+        self.has_older = has_older
+        self.has_newer = has_newer
+        self._field = field
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _cursor(self, obj):
+        return encode_cursor(getattr(obj, self._field), obj.pk)
+
+    def _edges(self):
+        """按时间先后返回 (最旧, 最新) 两个边界对象。"""
+        objs = self.object_list
+        first, last = objs[0], objs[-1]
+        if (getattr(first, self._field), first.pk) > (getattr(last, self._field), last.pk):
+            first, last = last, first
+        return first, last
+
+    @property
+    def has_other_pages(self):
+        return self.has_older or self.has_newer
+
+    @property
+    def older_cursor(self):
+        if not self.object_list or not self.has_older:
+            return None
+        return self._cursor(self._edges()[0])
+
+    @property
+    def newer_cursor(self):
+        if not self.object_list or not self.has_newer:
+            return None
+        return self._cursor(self._edges()[1])
+
+
+def paginate_by_cursor(qs, before=None, after=None, per_page=20, field='created_at', display='desc'):
+    """对 queryset 做游标分页，返回 CursorPage。
+
+    display='desc' 时本页按新到旧排列（文章、通知），'asc' 时按旧到新排列（聊天记录）。
+    """
+    model = qs.model
+    before_key = decode_cursor(before, model)
+    after_key = decode_cursor(after, model) if before_key is None else None
+
+    if after_key is not None:
+        ts, pk = after_key
+        qs = qs.filter(Q(**{f'{field}__gt': ts}) | Q(**{field: ts, 'pk__gt': pk}))
+        qs = qs.order_by(field, 'pk')
+    else:
+        if before_key is not None:
+            ts, pk = before_key
+            qs = qs.filter(Q(**{f'{field}__lt': ts}) | Q(**{field: ts, 'pk__lt': pk}))
+        qs = qs.order_by(f'-{field}', '-pk')
+
+    # 多取一行用于判断该方向上是否还有数据
+    rows = list(qs[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if after_key is not None:
+        # rows 按旧到新排列
+        has_newer, has_older = has_more, True
+        if display == 'desc':
+            rows.reverse()
+    else:
+        has_older, has_newer = has_more, before_key is not None
+        if display == 'asc':
+            rows.reverse()
+
+    return CursorPage(rows, has_older=has_older, has_newer=has_newer, field=field)
+
+
+def _after_key(fields, values):
+    """字典序大于 values 的条件：f1 > v1 OR (f1 = v1 AND f2 > v2) OR ..."""
+    cond = Q()
+    for i, field in enumerate(fields):
+        cond |= Q(**dict(zip(fields[:i], values[:i])), **{f'{field}__gt': values[i]})
+    return cond
+
+
+def iter_keyset(qs, fields=('created_at', 'pk'), chunk_size=500, key=None):
+    """按 fields 的字典序分批读取 queryset，逐行产出。
+
+    每批是一条 WHERE (fields) > (上一批最后一行) ORDER BY fields LIMIT chunk_size 的查询，
+    取完即释放，任意时刻内存中只有一批行。queryset.iterator() 做不到这一点：
+    MySQL（mysqlclient）默认把整个结果集缓冲到客户端，chunk_size 只影响模型实例化的批次。
+    fields 的组合必须唯一（通常以 pk 结尾）；key 用于从行中取出 fields 的值，
+    默认按属性读取，values_list() 的行需自行传入。
+    """
+    fields = tuple(fields)
+    if key is None:
+        def key(obj):
+            return tuple(getattr(obj, f) for f in fields)
+    qs = qs.order_by(*fields)
+    page = qs
+    while True:
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        page = qs.filter(_after_key(fields, key(rows[-1])))
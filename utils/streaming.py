@@ -0,0 +1,90 @@
+"""流式 JSON / NDJSON 响应。
+
+JsonResponse 需要先把全部结果拼成 Python 列表再一次性编码，内存峰值随结果大小增长。
+这里逐项编码、攒满一个缓冲块再输出；数据源应按批查询（utils.pagination.iter_keyset），
+这样任意时刻内存中只有一批数据库行和一个输出缓冲。注意不要用 queryset.iterator()：
+MySQL（mysqlclient）下它仍会先把整个结果集读到客户端。
+
+- StreamingJsonResponse：输出与 JsonResponse 相同格式的 JSON 对象，客户端无需改动；
+- StreamingNdjsonResponse：每行一个 JSON 对象（application/x-ndjson），适合导出类接口，
+  客户端可以边下载边解析。
+
+响应开始输出后状态码已无法更改，参数校验等可能失败的步骤应在构造响应之前完成。
+输出中途出错（如数据库断开）时记录日志，并以错误标记收尾，而不是留下截断的文本：
+JSON 对象在列表之后以 "error" 字段结束（不再输出 tail），NDJSON 最后一行为 {"error": ...}。
+客户端应检查该字段，状态码仍是 200。
+"""
+import json
+import logging
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+# 输出缓冲达到该长度（字符数）时向外输出一块
+STREAM_BUFFER_SIZE = 64 * 1024
+# 输出中途出错时的错误标记
+STREAM_ERROR = 'stream interrupted'
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, cls=DjangoJSONEncoder)
+
+
+def _buffered(pieces, size=STREAM_BUFFER_SIZE):
+    buf, length = [], 0
+    for piece in pieces:
+        buf.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buf)
+            buf, length = [], 0
+    if buf:
+        yield ''.join(buf)
+
+
+def iter_json_object(items, key, head=None, tail=None):
+    """逐块生成 {**head, key: [items...], **tail()} 的 JSON 文本。
+
+    tail 为可调用对象，在列表输出完之后才求值，用于依赖最后一项的字段（如同步游标）。
+    """
+    def pieces():
+        yield '{'
+        for k, v in (head or {}).items():
+            yield f'{_dumps(k)}: {_dumps(v)}, '
+        yield f'{_dumps(key)}: ['
+        try:
+            for i, item in enumerate(items):
+                yield (', ' if i else '') + _dumps(item)
+        except Exception:
+            logger.exception('流式 JSON 输出中断')
+            yield f'], {_dumps("error")}: {_dumps(STREAM_ERROR)}}}'
+            return
+        yield ']'
+        for k, v in (tail() if tail else {}).items():
+            yield f', {_dumps(k)}: {_dumps(v)}'
+        yield '}'
+    return _buffered(pieces())
+
+
+def iter_ndjson(items):
+    def lines():
+        try:
+            for item in items:
+                yield _dumps(item) + '\n'
+        except Exception:
+            logger.exception('流式 NDJSON 输出中断')
+            yield _dumps({'error': STREAM_ERROR}) + '\n'
+    return _buffered(lines())
+
+
+class StreamingJsonResponse(StreamingHttpResponse):
+    def __init__(self, items, key, head=None, tail=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(iter_json_object(items, key, head=head, tail=tail), **kwargs)
+
+
+class StreamingNdjsonResponse(StreamingHttpResponse):
+    def __init__(self, items, **kwargs):
+        kwargs.setdefault('content_type', 'application/x-ndjson')
+        super().__init__(iter_ndjson(items), **kwargs)